@@ -0,0 +1,306 @@
+"""
+Optional local analytics store: the flattened rows of every export, in one typed table
+per export (SalesOrders lines, Invoices, StockOnHand, ...), queryable offline.
+
+The export pipeline tees each export's rows into the store while they are written to the
+file, so the tables follow the API without extra requests. Each load is one upsert
+transaction: the stored rows of every key in it are replaced, so incremental runs
+(modifiedSince) only touch the documents that changed. The key is Guid, except for
+SalesOrders (OrderGuid: an order's lines are replaced together) and StockOnHand
+(ProductGuid + WarehouseGuid).
+
+DuckDB (columnar, pip install duckdb) is used when installed, SQLite otherwise. A DuckDB
+file can only be opened by one process at a time; with several worker processes use
+engine="sqlite". Column types are inferred over every row of a load (exports.columns,
+shared with the Parquet/Arrow writers): datetimes are TIMESTAMP, bools BOOLEAN, ints
+BIGINT, ints mixed with floats DOUBLE and anything else text. A later load adds new
+columns and widens existing ones (e.g. BIGINT -> DOUBLE) instead of truncating values.
+
+Run: python analytics_store.py "SELECT CustomerName, SUM(SubTotal) FROM Invoices GROUP BY 1"
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from exports import columns
+
+_DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "analytics")
+
+# rows spooled (and inserted) per chunk
+BATCH_ROWS = 5000
+
+KEY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "SalesOrders": ("OrderGuid",),
+    "StockOnHand": ("ProductGuid", "WarehouseGuid"),
+}
+DEFAULT_KEY = ("Guid",)
+
+ENGINES = ("auto", "duckdb", "sqlite")
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        return None
+    return duckdb
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# column kind (exports.columns) -> declared SQL type, and back for existing tables
+_SQL_TYPES = {
+    columns.BOOL: "BOOLEAN",
+    columns.INT: "BIGINT",
+    columns.FLOAT: "DOUBLE",
+    columns.DATETIME: "TIMESTAMP",
+    columns.DATE: "DATE",
+}
+_KINDS = {sql_type: kind for kind, sql_type in _SQL_TYPES.items()}
+
+
+def _sql_type(kind: str) -> str:
+    return _SQL_TYPES.get(kind, "VARCHAR")
+
+
+def _kind(sql_type: str) -> str:
+    return _KINDS.get(sql_type.upper(), columns.STRING)
+
+
+class AnalyticsStore:
+    def __init__(self, path: Optional[str] = None, engine: str = "auto"):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown analytics engine {engine!r} (expected one of {', '.join(ENGINES)})")
+        if engine == "auto":
+            engine = "duckdb" if _duckdb() is not None else "sqlite"
+        if engine == "duckdb" and _duckdb() is None:
+            raise RuntimeError("The duckdb analytics engine requires duckdb (pip install duckdb).")
+        self.engine = engine
+        self.path = path or os.path.join(_DEFAULT_DIR, "analytics.duckdb" if engine == "duckdb" else "analytics.sqlite3")
+
+        self._lock = threading.Lock()
+        self._conn: Any = None
+        self._columns: Dict[str, Dict[str, str]] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.last_error: Optional[str] = None
+
+    # --- connection ----------------------------------------------------------
+
+    def _connect(self) -> Any:
+        # caller holds self._lock; one connection shared by the export worker threads
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if self.engine == "duckdb":
+                self._conn = _duckdb().connect(self.path)
+            else:
+                conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._columns.clear()
+
+    def _table_columns(self, conn: Any, table: str) -> Dict[str, str]:
+        """column -> kind of an existing table (empty if there is none)."""
+        if table not in self._columns:
+            if self.engine == "duckdb":
+                rows = conn.execute(
+                    "SELECT column_name, data_type FROM information_schema.columns "
+                    "WHERE table_name = ? ORDER BY ordinal_position",
+                    [table],
+                ).fetchall()
+            else:
+                rows = [(r[1], r[2]) for r in conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()]
+            self._columns[table] = {name: _kind(sql_type) for name, sql_type in rows}
+        return self._columns[table]
+
+    def _ensure_table(self, conn: Any, table: str, headers: Sequence[str], kinds: Sequence[str]) -> None:
+        existing = self._table_columns(conn, table)
+        if not existing:
+            cols = ", ".join(f"{_quote(h)} {_sql_type(k)}" for h, k in zip(headers, kinds))
+            conn.execute(f"CREATE TABLE {_quote(table)} ({cols})")
+            key = [c for c in KEY_COLUMNS.get(table, DEFAULT_KEY) if c in headers]
+            if key:
+                conn.execute(
+                    f"CREATE INDEX {_quote('ix_' + table + '_key')} "
+                    f"ON {_quote(table)} ({', '.join(_quote(c) for c in key)})"
+                )
+        else:
+            for h, kind in zip(headers, kinds):
+                if h not in existing:
+                    conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(h)} {_sql_type(kind)}")
+                    continue
+                wider = columns.widen_kind(existing[h], kind)
+                # SQLite keeps each value's own type whatever the declared one, so only DuckDB
+                # needs the column widened (e.g. BIGINT -> DOUBLE) before the new values go in
+                if wider != existing[h] and self.engine == "duckdb":
+                    conn.execute(f"ALTER TABLE {_quote(table)} ALTER COLUMN {_quote(h)} SET DATA TYPE {_sql_type(wider)}")
+        self._columns.pop(table, None)
+
+    # --- loading -------------------------------------------------------------
+
+    def _value(self, value: Any) -> Any:
+        if self.engine == "sqlite":
+            if isinstance(value, (datetime, date)):
+                return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+            if isinstance(value, Decimal):
+                return float(value)
+        if isinstance(value, (dict, list)):
+            return str(value)
+        return value
+
+    def _key_index(self, table: str, headers: Sequence[str]) -> List[int]:
+        key_columns = KEY_COLUMNS.get(table, DEFAULT_KEY)
+        if not all(c in headers for c in key_columns):
+            raise ValueError(f"{table} rows have no {', '.join(key_columns)} column to upsert by")
+        return [list(headers).index(c) for c in key_columns]
+
+    def _apply(self, table: str, headers: Sequence[str], spool: columns.RowSpool,
+               keys: Set[Tuple[Any, ...]]) -> None:
+        """One transaction: widen the table, drop the stored rows of every key, insert the spooled rows."""
+        key_columns = KEY_COLUMNS.get(table, DEFAULT_KEY)
+        # NULL-safe equality, e.g. StockOnHand rows without a warehouse
+        eq = "IS" if self.engine == "sqlite" else "IS NOT DISTINCT FROM"
+        where = " AND ".join(f"{_quote(c)} {eq} ?" for c in key_columns)
+        insert = (
+            f"INSERT INTO {_quote(table)} ({', '.join(_quote(h) for h in headers)}) "
+            f"VALUES ({', '.join('?' for _ in headers)})"
+        )
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                self._ensure_table(conn, table, headers, spool.kinds)
+                pending = iter(keys)
+                while True:
+                    batch = [list(k) for k in islice(pending, BATCH_ROWS)]
+                    if not batch:
+                        break
+                    conn.executemany(f"DELETE FROM {_quote(table)} WHERE {where}", batch)
+                for chunk in spool.chunks():
+                    conn.executemany(insert, [[self._value(v) for v in r] for r in chunk])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                # a rolled back ALTER leaves the cached column types stale
+                self._columns.pop(table, None)
+                raise
+
+    def load(self, table: str, headers: Sequence[str], rows: Iterable[List[Any]]) -> Iterator[List[Any]]:
+        """
+        Passes rows through unchanged while spooling them aside; once the last row has gone
+        by they are upserted into table in a single transaction, so a table is never left
+        partly refreshed, and a failed or abandoned export changes nothing. Column types are
+        widened over every row. Rows without a key are skipped.
+        A failing store never fails the export: the error is kept in last_error.
+        """
+        headers = list(headers)
+        try:
+            key_idx: Optional[List[int]] = self._key_index(table, headers)
+        except ValueError as e:
+            self.last_error = str(e)
+            key_idx = None
+
+        if key_idx is None:
+            yield from rows
+            return
+
+        keys: Set[Tuple[Any, ...]] = set()
+        with columns.RowSpool(len(headers)) as spool:
+            rows = iter(rows)
+            while True:
+                chunk = list(islice(rows, BATCH_ROWS))
+                if not chunk:
+                    break
+                keyed = []
+                for r in chunk:
+                    key = tuple(r[i] if i < len(r) else None for i in key_idx)
+                    if any(k is not None for k in key):
+                        keys.add(key)
+                        keyed.append(r)
+                spool.add(keyed)
+                yield from chunk
+
+            try:
+                if spool.rows:
+                    self._apply(table, headers, spool, keys)
+            except Exception as e:
+                self.last_error = f"{table}: {e}"
+                return
+
+        with self._lock:
+            self.stats[table] = {
+                "rows": spool.rows,
+                "keys": len(keys),
+                "loaded_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+    # --- querying ------------------------------------------------------------
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """(column names, rows) of a read query."""
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute(sql, list(params))
+            headers = [d[0] for d in cur.description or []]
+            return headers, cur.fetchall()
+
+    def tables(self) -> Dict[str, int]:
+        """table -> row count."""
+        if self.engine == "duckdb":
+            names_sql = "SELECT table_name FROM information_schema.tables WHERE table_schema = 'main' ORDER BY 1"
+        else:
+            names_sql = "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY 1"
+        _, names = self.query(names_sql)
+        return {name: self.query(f"SELECT COUNT(*) FROM {_quote(name)}")[1][0][0] for name, in names}
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            loads = {table: dict(s) for table, s in self.stats.items()}
+        return {
+            "engine": self.engine,
+            "path": self.path,
+            "tables": self.tables(),
+            "last_loads": loads,
+            "last_error": self.last_error,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the local analytics store.")
+    parser.add_argument("sql", nargs="?", help="query to run; lists the tables when omitted")
+    parser.add_argument("--path", default=os.getenv("ANALYTICS_STORE_PATH") or None)
+    parser.add_argument("--engine", choices=ENGINES, default=os.getenv("ANALYTICS_STORE_ENGINE", "auto"))
+    args = parser.parse_args(argv)
+
+    store = AnalyticsStore(args.path, engine=args.engine)
+    try:
+        if not args.sql:
+            for table, count in store.tables().items():
+                print(f"{table}\t{count}")
+            return 0
+        headers, rows = store.query(args.sql)
+        print("\t".join(headers))
+        for r in rows:
+            print("\t".join("" if v is None else str(v) for v in r))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,40 @@
 from dotenv import load_dotenv
-from db import start_run, finish_run
+from db import start_run, finish_run, raw_dedup_stats, raw_writer_stats
 from schedules import add_schedule, delete_schedule, list_schedules
 
 load_dotenv()
 
-from flask import Flask, redirect, render_template, request, Response
+from flask import Flask, redirect, render_template, request, send_file
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
-import io
-from typing import Any, Dict, Optional, List
-
+import atexit
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, List
+
+from analytics_store import AnalyticsStore
 from config import Config
+from jobs import ExportProgress, JobManager
+import reports
+from scheduler import FREQUENCIES, Scheduler
+from sync_state import reset_sync_state
+from rate_limit import TokenBucket
+from replay import DbPayloadSource, FilePayloadSource, ReplayClient
+from response_cache import ResponseCache, parse_ttls
 from unleashed_client import UnleashedClient
+from exports.utils_db import drain_raw_payloads, raw_queue_stats
+from exports.result_cache import result_cache_stats
 from exports import (
+    ExportResult,
+    formats,
     sales_orders,
     customers,
     suppliers,
@@ -32,7 +54,37 @@ client = UnleashedClient(
     api_key=cfg.UNLEASHED_API_KEY,
     client_type=cfg.UNLEASHED_CLIENT_TYPE,
     timeout_seconds=cfg.REQUEST_TIMEOUT_SECONDS,
+    page_size=cfg.UNLEASHED_PAGE_SIZE,
+    page_workers=cfg.UNLEASHED_PAGE_WORKERS,
+    # parallel exports, in each background job worker plus one request-driven download
+    concurrent_callers=cfg.EXPORT_WORKERS * (cfg.EXPORT_JOB_WORKERS + 1),
+    pool_size=cfg.UNLEASHED_POOL_SIZE,
+    max_retries=cfg.UNLEASHED_MAX_RETRIES,
+    rate_limiter=(
+        TokenBucket(cfg.UNLEASHED_RATE_LIMIT_PER_SECOND)
+        if cfg.UNLEASHED_RATE_LIMIT_PER_SECOND > 0
+        else None
+    ),
+    response_cache=(
+        ResponseCache(
+            path=cfg.RESPONSE_CACHE_PATH or None,
+            default_ttl_seconds=cfg.RESPONSE_CACHE_TTL_SECONDS,
+            ttls=parse_ttls(cfg.RESPONSE_CACHE_ENDPOINT_TTLS),
+            max_bytes=cfg.RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+        )
+        if cfg.RESPONSE_CACHE_ENABLED
+        else None
+    ),
+)
+atexit.register(client.close)
+
+analytics = (
+    AnalyticsStore(path=cfg.ANALYTICS_STORE_PATH or None, engine=cfg.ANALYTICS_STORE_ENGINE)
+    if cfg.ANALYTICS_STORE_ENABLED
+    else None
 )
+if analytics is not None:
+    atexit.register(analytics.close)
 
 EXPORTS = {
     "products_api": {
@@ -41,7 +93,8 @@ EXPORTS = {
         "description": "Product master data",
         "sheet_name": "Products",
         "dummy": products.dummy,
-        "api": lambda: products.from_api(client),
+        "module": products,
+        "api": lambda **kwargs: products.from_api(client, **kwargs),
     },
     "invoices": {
         "category": "sales",
@@ -49,7 +102,8 @@ EXPORTS = {
         "description": "Revenue documents (header-only for now)",
         "sheet_name": "Invoices",
         "dummy": invoices.dummy,
-        "api": lambda: invoices.from_api(client),
+        "module": invoices,
+        "api": lambda **kwargs: invoices.from_api(client, **kwargs),
     },
     "credit_notes": {
         "category": "sales",
@@ -57,14 +111,16 @@ EXPORTS = {
         "description": "Returns and revenue corrections",
         "sheet_name": "CreditNotes",
         "dummy": credit_notes.dummy,
-        "api": lambda: credit_notes.from_api(client),
+        "module": credit_notes,
+        "api": lambda **kwargs: credit_notes.from_api(client, **kwargs),
     },
     "warehouses": {
         "category": "inventory",
         "label": "Warehouses",
         "description": "Warehouse master data",
         "sheet_name": "Warehouses",
-        "api": lambda: warehouses.from_api(client),
+        "module": warehouses,
+        "api": lambda **kwargs: warehouses.from_api(client, **kwargs),
     },
     "sales_shipments": {
         "category": "sales",
@@ -72,14 +128,16 @@ EXPORTS = {
         "description": "Dispatch / fulfilment documents",
         "sheet_name": "SalesShipments",
         "dummy": sales_shipments.dummy,
-        "api": lambda: sales_shipments.from_api(client),
+        "module": sales_shipments,
+        "api": lambda **kwargs: sales_shipments.from_api(client, **kwargs),
     },
     "stock_on_hand_api": {
         "category": "inventory",
         "label": "Stock On Hand (API)",
         "description": "Inventory snapshot (by product/warehouse)",
         "sheet_name": "StockOnHand",
-        "api": lambda: stock_on_hand.from_api(client),
+        "module": stock_on_hand,
+        "api": lambda **kwargs: stock_on_hand.from_api(client, **kwargs),
     },
     "sales_orders": {
         "category": "sales",
@@ -87,6 +145,7 @@ EXPORTS = {
         "description": "Transactional",
         "sheet_name": "SalesOrders",
         "dummy": sales_orders.dummy,
+        "module": sales_orders,
         "api": lambda **kwargs: sales_orders.from_api(client, **kwargs),
     },
     "customers": {
@@ -95,7 +154,8 @@ EXPORTS = {
         "description": "Customer master data",
         "sheet_name": "Customers",
         "dummy": customers.dummy,
-        "api": lambda: customers.from_api(client),
+        "module": customers,
+        "api": lambda **kwargs: customers.from_api(client, **kwargs),
     },
     "suppliers": {
         "category": "purchasing",
@@ -103,81 +163,378 @@ EXPORTS = {
         "description": "Supplier master data",
         "sheet_name": "Suppliers",
         "dummy": suppliers.dummy,
-        "api": lambda: suppliers.from_api(client),
+        "module": suppliers,
+        "api": lambda **kwargs: suppliers.from_api(client, **kwargs),
     },
 }
 
-# Placeholder reports for the dashboard (run via Azure SQL later; Run buttons are placeholders)
+# Reports for the dashboard; "exports" are the EXPORTS a scheduled run of the report pulls.
+# Their figures are materialised by reports.py from the latest stored payloads.
 DASHBOARD_REPORTS = [
-    {"key": "sales_summary", "label": "Sales Summary", "description": "Summary of sales and revenue from Unleashed data."},
-    {"key": "inventory_report", "label": "Inventory Report", "description": "Stock levels and inventory position."},
-    {"key": "customer_report", "label": "Customer Report", "description": "Customer list and sales dimensions."},
-    {"key": "product_report", "label": "Product Report", "description": "Product master and cost foundation."},
-    {"key": "purchasing_report", "label": "Purchasing Report", "description": "Suppliers and purchasing data."},
+    {"key": "sales_summary", "label": "Sales Summary", "description": "Summary of sales and revenue from Unleashed data.",
+     "exports": ["sales_orders", "invoices", "credit_notes"]},
+    {"key": "inventory_report", "label": "Inventory Report", "description": "Stock levels and inventory position.",
+     "exports": ["stock_on_hand_api", "warehouses", "products_api"]},
+    {"key": "customer_report", "label": "Customer Report", "description": "Customer list and sales dimensions.",
+     "exports": ["customers"]},
+    {"key": "product_report", "label": "Product Report", "description": "Product master and cost foundation.",
+     "exports": ["products_api"]},
+    {"key": "purchasing_report", "label": "Purchasing Report", "description": "Suppliers and purchasing data.",
+     "exports": ["suppliers"]},
 ]
 
 
-def build_workbook(selected_keys):
-    wb = Workbook()
-    wb.remove(wb.active)
+def _fetch_export(key: str, run_id: Optional[str], api_client: Any = None, progress: Optional[ExportProgress] = None):
+    if progress is not None:
+        progress.started(key)
+    try:
+        sheet_name, headers, rows = _call_export(key, run_id, api_client, progress)
+    except Exception:
+        if progress is not None:
+            progress.failed(key)
+        raise
+
+    if analytics is not None and _is_unleashed_data(key, api_client):
+        rows = analytics.load(sheet_name, headers, rows)
+    if progress is not None:
+        rows = progress.count_rows(key, rows)
+    return sheet_name, headers, rows
+
+
+def _is_unleashed_data(key: str, api_client: Any = None) -> bool:
+    """True when _call_export serves this export from Unleashed (live or replayed), not dummy rows."""
+    if "module" not in EXPORTS[key]:
+        return False
+    return api_client is not None or (cfg.USE_UNLEASHED_API and client.is_configured())
+
+
+def _reset_sync(keys: Iterable[str]) -> None:
+    """Drops the incremental sync state of these exports, so their next pull is a full one."""
+    for key in keys:
+        export = EXPORTS.get(key)
+        if export and "module" in export:
+            # API exports are named after the Unleashed endpoint they pull
+            reset_sync_state("unleashed_client_1", export["sheet_name"])
+
+
+def _call_export(key: str, run_id: Optional[str], api_client: Any = None, progress: Optional[ExportProgress] = None):
+    export = EXPORTS[key]
+
+    # replay (or any stand-in client): same transforms, no live API and no raw storage
+    if api_client is not None and "module" in export:
+        if progress is not None:
+            api_client = progress.client(key, api_client)
+        return export["module"].from_api(api_client)
+
+    if "generator" in export:
+        return export["generator"]()
+
+    if not cfg.USE_UNLEASHED_API or not client.is_configured():
+        return export["dummy"]()
+
+    kwargs = dict(run_id=run_id, company_id="unleashed_client_1", incremental=cfg.INCREMENTAL_SYNC)
+    if progress is not None and "module" in export:
+        # same call as export["api"], through a client that reports each page fetched
+        return export["module"].from_api(progress.client(key, client), **kwargs)
+    return export["api"](**kwargs)
+
+
+def _column_widths(headers: List[str], rows: List[List[Any]]) -> List[int]:
+    widths = [len(str(h)) for h in headers]
+    n = len(widths)
+    for r in rows:
+        for col_idx, value in enumerate(r[:n]):
+            if value is None:
+                continue
+            length = len(value) if isinstance(value, str) else len(str(value))
+            if length > widths[col_idx]:
+                widths[col_idx] = length
+    return [min(w + 2, 40) for w in widths]
+
+
+def _write_sheet(wb: Workbook, sheet_name: str, headers: List[str], rows: Iterable[List[Any]]) -> None:
+    ws = wb.create_sheet(title=sheet_name[:31])
+
+    # write-only sheets need column widths before the first row is written, so size
+    # them from a buffered prefix of rows and stream the rest straight through
+    rows = iter(rows)
+    sample_size = cfg.XLSX_WIDTH_SAMPLE_ROWS
+    sample = list(islice(rows, sample_size)) if sample_size > 0 else list(rows)
+
+    for col_idx, width in enumerate(_column_widths(headers, sample), start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    header_cells = []
+    for h in headers:
+        cell = WriteOnlyCell(ws, value=h)
+        cell.font = Font(bold=True)
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for r in sample:
+        ws.append(r)
+    for r in rows:
+        ws.append(r)
+
+
+def send_workbook(wb: Workbook, filename: str):
+    """
+    Saves into an anonymous temp file and streams it back, so the workbook is
+    never held in memory as a second full copy. The file is removed once closed.
+    """
+    f = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        wb.save(f)
+        f.seek(0)
+    except Exception:
+        f.close()
+        raise
+
+    return send_file(
+        f,
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name=filename,
+    )
+
 
+@contextmanager
+def _etl_run(keys: Iterable[str] = (), replay: bool = False):
+    """
+    Wraps a batch of exports in a dbo.etl_run row (when the API and DB are in use; never for replays).
+    Once the run succeeds, the dashboard reports built from these exports are refreshed.
+    """
     run_id = None
-    if cfg.USE_UNLEASHED_API and client.is_configured():
+    if not replay and cfg.USE_UNLEASHED_API and client.is_configured():
         try:
             run_id = start_run(company_id="unleashed_client_1")
         except Exception:
             run_id = None
 
     try:
-        for key in selected_keys:
-            if key not in EXPORTS:
-                continue
+        yield run_id
+    except Exception as e:
+        if run_id:
+            drain_raw_payloads(timeout=cfg.RAW_DRAIN_TIMEOUT_SECONDS, run_id=run_id)
+            finish_run(run_id, "FAILED", notes=str(e))
+        raise
 
-            export = EXPORTS.get(key)
+    if run_id:
+        # payloads are persisted in the background; wait for them before closing the run
+        drain_raw_payloads(timeout=cfg.RAW_DRAIN_TIMEOUT_SECONDS, run_id=run_id)
+        finish_run(run_id, "SUCCESS")
+        if cfg.REPORT_REFRESH_AFTER_RUN:
+            _refresh_reports(keys)
 
-            if not export:
-                continue
 
-            if "generator" in export:
-                sheet_name, headers, rows = export["generator"]()
-            else:
-                if not cfg.USE_UNLEASHED_API or not client.is_configured():
-                    sheet_name, headers, rows = export["dummy"]()
-                else:
-                    api_fn = export["api"]
-
-                    try:
-                        sheet_name, headers, rows = api_fn(
-                            run_id=run_id, company_id="unleashed_client_1"
-                        )
-                    except TypeError:
-                        sheet_name, headers, rows = api_fn()
-
-            ws = wb.create_sheet(title=sheet_name[:31])
-            ws.append(headers)
-            for r in rows:
-                ws.append(r)
-
-            for cell in ws[1]:
-                cell.font = cell.font.copy(bold=True)
-
-            for col_idx in range(1, len(headers) + 1):
-                col_letter = get_column_letter(col_idx)
-                max_len = 0
-                for cell in ws[col_letter]:
-                    if cell.value is not None:
-                        max_len = max(max_len, len(str(cell.value)))
-                ws.column_dimensions[col_letter].width = min(max_len + 2, 40)
+_ROWS_END = object()
 
-        if run_id:
-            finish_run(run_id, "SUCCESS")
 
-        return wb
+class _ExportFailed:
+    def __init__(self, error: BaseException):
+        self.error = error
 
-    except Exception as e:
-        if run_id:
-            finish_run(run_id, "FAILED", notes=str(e))
+
+def _put_until(q: "queue.Queue[Any]", item: Any, cancelled: threading.Event) -> bool:
+    while not cancelled.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce_export(key: str, run_id: Optional[str], api_client: Any, progress: Optional[ExportProgress],
+                    q: "queue.Queue[Any]", cancelled: threading.Event) -> None:
+    """Worker: runs one export and feeds (sheet_name, headers), then each row, into its bounded queue."""
+    try:
+        sheet_name, headers, rows = _fetch_export(key, run_id, api_client, progress)
+        if not _put_until(q, (sheet_name, headers), cancelled):
+            return
+        for r in rows:
+            if not _put_until(q, r, cancelled):
+                return
+        _put_until(q, _ROWS_END, cancelled)
+    except BaseException as e:
+        _put_until(q, _ExportFailed(e), cancelled)
+
+
+def _drain_rows(q: "queue.Queue[Any]") -> Iterator[List[Any]]:
+    while True:
+        item = q.get()
+        if item is _ROWS_END:
+            return
+        if isinstance(item, _ExportFailed):
+            raise item.error
+        yield item
+
+
+def _iter_exports(
+    keys: List[str],
+    run_id: Optional[str],
+    workers: Optional[int] = None,
+    api_client: Any = None,
+    progress: Optional[ExportProgress] = None,
+) -> Iterator[ExportResult]:
+    """
+    Yields each export's (sheet_name, headers, rows) in the requested order.
+    Serially the rows are the exports' own lazy iterators. In parallel, each export
+    runs ahead on a worker into a queue of at most EXPORT_PREFETCH_ROWS rows, so
+    API time overlaps across exports while memory stays bounded. Each result's rows
+    must be consumed before the next result is requested. Callers close the generator
+    (contextlib.closing) so the workers are stopped before an error propagates.
+    """
+    workers = workers or cfg.EXPORT_WORKERS
+    if workers <= 1 or len(keys) <= 1:
+        for key in keys:
+            yield _fetch_export(key, run_id, api_client, progress)
+        return
+
+    cancelled = threading.Event()
+    queues = [queue.Queue(maxsize=max(cfg.EXPORT_PREFETCH_ROWS, 1)) for _ in keys]
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(keys)), thread_name_prefix="export")
+    try:
+        for key, q in zip(keys, queues):
+            pool.submit(_produce_export, key, run_id, api_client, progress, q, cancelled)
+
+        for q in queues:
+            first = q.get()
+            if isinstance(first, _ExportFailed):
+                raise first.error
+            sheet_name, headers = first
+            yield sheet_name, headers, _drain_rows(q)
+    finally:
+        # a failure (or an early stop by the consumer) releases producers blocked on full queues
+        cancelled.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def build_workbook(selected_keys, workers: Optional[int] = None, api_client: Any = None,
+                   progress: Optional[ExportProgress] = None):
+    # write-only: rows are serialised as they are appended instead of kept as cell objects
+    wb = Workbook(write_only=True)
+
+    keys = [key for key in selected_keys if EXPORTS.get(key)]
+    with _etl_run(keys, replay=api_client is not None) as run_id:
+        with closing(_iter_exports(keys, run_id, workers, api_client, progress)) as results:
+            for sheet_name, headers, rows in results:
+                _write_sheet(wb, sheet_name, headers, rows)
+
+    return wb
+
+
+def build_export_file(selected_keys, fmt: str, workers: Optional[int] = None, api_client: Any = None,
+                      progress: Optional[ExportProgress] = None, f: Optional[BinaryIO] = None):
+    """
+    Writes the selected exports in a non-Excel format to f (default: an anonymous temp
+    file): a single file for one export, a zip with one member per export otherwise.
+    Returns the file positioned at the start.
+    """
+    keys = [key for key in selected_keys if EXPORTS.get(key)]
+    f = f or tempfile.TemporaryFile()
+    try:
+        with _etl_run(keys, replay=api_client is not None) as run_id:
+            # closed before _etl_run sees an error, so no worker keeps fetching for a finished run
+            with closing(_iter_exports(keys, run_id, workers, api_client, progress)) as results:
+                if len(keys) == 1:
+                    formats.write_export(f, next(results), fmt)
+                else:
+                    formats.write_zip(f, results, fmt)
+        f.seek(0)
+    except Exception:
+        f.close()
         raise
+    return f
+
+
+def _download_meta(selected_keys, fmt: str, name: str):
+    """(mimetype, filename) of what send_exports / a job produces for these keys."""
+    if fmt == "xlsx":
+        return formats.FORMATS["xlsx"]["mimetype"], f"{name}.xlsx"
+    if len([key for key in selected_keys if EXPORTS.get(key)]) == 1:
+        return formats.FORMATS[fmt]["mimetype"], formats.filename_for(name, fmt)
+    return formats.ZIP_MIMETYPE, f"{name}.zip"
+
+
+def send_exports(selected_keys, fmt: str, name: str, api_client: Any = None):
+    if fmt == "xlsx":
+        return send_workbook(build_workbook(selected_keys, api_client=api_client), f"{name}.xlsx")
+
+    f = build_export_file(selected_keys, fmt, api_client=api_client)
+    mimetype, filename = _download_meta(selected_keys, fmt, name)
+    return send_file(f, mimetype=mimetype, as_attachment=True, download_name=filename)
+
+
+def _payload_source(run_id: Optional[str] = None):
+    if cfg.REPLAY_DIR:
+        return FilePayloadSource(cfg.REPLAY_DIR)
+    # with incremental sync the latest runs only hold deltas; the sync snapshot has everything
+    return DbPayloadSource(run_id, company_id="unleashed_client_1", use_sync_snapshot=cfg.INCREMENTAL_SYNC)
+
+
+def _replay_client(run_id: Optional[str] = None) -> ReplayClient:
+    return ReplayClient(_payload_source(run_id))
+
+
+def _refresh_reports(keys: Optional[Iterable[str]] = None, force: bool = False, report_keys: Optional[List[str]] = None):
+    """Recomputes, in the background, the reports using any of these exports (None: all of them)."""
+    endpoints = None
+    if keys is not None:
+        endpoints = {reports.endpoint_for_module(EXPORTS[key].get("module")) for key in keys if key in EXPORTS}
+        endpoints.discard(None)
+        if not endpoints:
+            return None
+    return reports.refresh_reports_async(_payload_source(), endpoints, force=force, report_keys=report_keys)
+
+
+def _run_job(job: Dict[str, Any], progress: ExportProgress, path: str) -> None:
+    """JobManager runner: builds the job's file at path."""
+    options = job.get("options") or {}
+    api_client = _replay_client(options.get("run_id")) if options.get("replay") else None
+    if options.get("full_sync") and api_client is None:
+        _reset_sync(job["keys"])
+
+    if job["format"] == "xlsx":
+        wb = build_workbook(job["keys"], api_client=api_client, progress=progress)
+        wb.save(path)
+        return
+
+    with open(path, "wb") as f:
+        build_export_file(job["keys"], job["format"], api_client=api_client, progress=progress, f=f)
+
+
+jobs_manager = JobManager(
+    _run_job,
+    workers=cfg.EXPORT_JOB_WORKERS,
+    retention_hours=cfg.EXPORT_JOB_RETENTION_HOURS,
+)
+atexit.register(jobs_manager.shutdown)
+
+
+def _run_schedule(schedule: Dict[str, Any]) -> Dict[str, Any]:
+    """Scheduler runner: builds the report's exports as a job and waits for it."""
+    report = next((r for r in DASHBOARD_REPORTS if r["key"] == schedule["report_key"]), None)
+    if report is None:
+        raise ValueError(f"Unknown report {schedule['report_key']!r}")
+
+    keys = [key for key in report["exports"] if key in EXPORTS]
+    mimetype, filename = _download_meta(keys, "xlsx", report["key"])
+    job = jobs_manager.submit(keys, "xlsx", filename, mimetype, options={"schedule_id": schedule["id"]})
+    return jobs_manager.wait(job["id"]) or job
+
+
+scheduler = Scheduler(
+    _run_schedule,
+    max_concurrent=cfg.SCHEDULER_MAX_CONCURRENT,
+    poll_seconds=cfg.SCHEDULER_POLL_SECONDS,
+    run_hour_utc=cfg.SCHEDULE_RUN_HOUR_UTC,
+    weekday=cfg.SCHEDULE_WEEKDAY,
+    jitter_minutes=cfg.SCHEDULE_JITTER_MINUTES,
+)
+if cfg.SCHEDULER_ENABLED:
+    scheduler.start()
+    atexit.register(scheduler.stop)
 
 
 def run_export(key: str, **kwargs):
@@ -197,28 +554,69 @@ def run_export(key: str, **kwargs):
 app = Flask(__name__, template_folder="templates", static_folder="static")
 
 
+JOB_STATUS_PILLS = {
+    "queued": ("Queued", "pill-info"),
+    "running": ("Running", "pill-warning"),
+    "succeeded": ("Succeeded", "pill-success"),
+    "failed": ("Failed", "pill-danger"),
+}
+
+
+def _format_job_time(iso_str: Optional[str]) -> str:
+    if not iso_str:
+        return "—"
+    try:
+        return datetime.fromisoformat(iso_str).strftime("%d %b %Y, %H:%M UTC")
+    except ValueError:
+        return iso_str
+
+
 def build_exports_list(category: Optional[str] = None):
+    try:
+        latest_jobs = jobs_manager.latest_by_export()
+    except Exception:
+        latest_jobs = {}
+
     exports_list = []
     for key, meta in EXPORTS.items():
         if category and meta.get("category") != category:
             continue
 
+        last_run, status, status_class = "—", "Idle", "pill-neutral"
+        job = latest_jobs.get(key)
+        if job:
+            export_status = (job.get("progress") or {}).get(key, {}).get("status") or job["status"]
+            if export_status == "queued" and job["status"] in ("succeeded", "failed"):
+                export_status = job["status"]
+            status, status_class = JOB_STATUS_PILLS.get(export_status, (export_status, "pill-neutral"))
+            last_run = _format_job_time(job.get("finished_at") or job.get("started_at") or job.get("created_at"))
+
         exports_list.append(
             {
                 "key": key,
                 "label": meta.get("label", key),
                 "description": meta.get("description", ""),
-                "last_run": "—",
-                "status": "Idle",
-                "status_class": "pill-neutral",
+                "last_run": last_run,
+                "status": status,
+                "status_class": status_class,
             }
         )
     return exports_list
 
 
 def build_reports_list() -> List[Dict[str, Any]]:
-    """Placeholder reports for dashboard and scheduler."""
-    return list(DASHBOARD_REPORTS)
+    """Dashboard reports with their latest materialised results (None until first computed)."""
+    reports_list = []
+    for r in DASHBOARD_REPORTS:
+        result = reports.load_report(r["key"])
+        reports_list.append(
+            {
+                **r,
+                "result": result,
+                "updated": _format_job_time(result.get("computed_at")) if result else None,
+            }
+        )
+    return reports_list
 
 
 def get_report_label(key: str) -> str:
@@ -272,6 +670,8 @@ def exports_by_category(category: str):
         page_title=title,
         page_subtitle=subtitle,
         exports=build_exports_list(category=category),
+        formats=formats.FORMATS,
+        incremental_sync=cfg.INCREMENTAL_SYNC,
     )
 
 
@@ -292,26 +692,52 @@ def api_status():
         "configured": client.is_configured(),
         "base_url": client.base_url,
         "client_type": client.client_type,
+        "endpoint_stats": client.stats(),
+        "raw_payload_queue": raw_queue_stats(),
+        "raw_payload_writer": raw_writer_stats(),
+        "raw_payload_dedup": raw_dedup_stats(),
+        "response_cache": client.response_cache.stats() if client.response_cache else None,
+        "result_cache": result_cache_stats(),
+        "scheduler": scheduler.status() if cfg.SCHEDULER_ENABLED else None,
+        "report_refresh": reports.report_refresh_status(),
+        "analytics_store": analytics.status() if analytics is not None else None,
     }
 
 
+@app.route("/reports/<key>")
+def report_result(key: str):
+    if key not in reports.REPORTS:
+        return {"error": "Unknown report"}, 404
+    result = reports.load_report(key)
+    if result is None:
+        return {"error": "Report has not been computed yet"}, 404
+    return result
+
+
+@app.route("/reports/<key>/refresh", methods=["POST"])
+def report_refresh(key: str):
+    """Recomputes the report from the latest stored payloads, even if nothing changed."""
+    if key not in reports.REPORTS:
+        return "Invalid report", 400
+    _refresh_reports(force=True, report_keys=[key])
+    return redirect("/")
+
+
 @app.route("/run-selected", methods=["POST"])
 def run_selected():
     selected = request.form.getlist("exports")
     if not selected:
         return "No exports selected", 400
 
-    wb = build_workbook(selected)
+    fmt = request.form.get("format", "xlsx")
+    if fmt not in formats.FORMATS:
+        return "Invalid format", 400
+    if not formats.is_available(fmt):
+        return f"Format {fmt} is not available on this server", 400
 
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-
-    return Response(
-        buf.getvalue(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=unleashed_exports.xlsx"},
-    )
+    if request.form.get("full") == "1":
+        _reset_sync(selected)
+    return send_exports(selected, fmt, "unleashed_exports")
 
 
 @app.route("/run-single", methods=["POST"])
@@ -320,17 +746,105 @@ def run_single():
     if key not in EXPORTS:
         return "Invalid export", 400
 
-    wb = build_workbook([key])
+    fmt = request.form.get("format", "xlsx")
+    if fmt not in formats.FORMATS:
+        return "Invalid format", 400
+    if not formats.is_available(fmt):
+        return f"Format {fmt} is not available on this server", 400
 
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
+    if request.form.get("full") == "1":
+        _reset_sync([key])
+    return send_exports([key], fmt, key)
 
-    return Response(
-        buf.getvalue(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={key}.xlsx"},
-    )
+
+@app.route("/replay-selected", methods=["POST"])
+def replay_selected():
+    """Rebuilds exports from stored raw payloads (a run_id, or the latest successful run) without calling Unleashed."""
+    selected = request.form.getlist("exports")
+    if not selected:
+        return "No exports selected", 400
+
+    fmt = request.form.get("format", "xlsx")
+    if fmt not in formats.FORMATS:
+        return "Invalid format", 400
+    if not formats.is_available(fmt):
+        return f"Format {fmt} is not available on this server", 400
+
+    run_id = (request.form.get("run_id") or "").strip() or None
+    return send_exports(selected, fmt, "unleashed_replay", api_client=_replay_client(run_id))
+
+
+@app.route("/jobs", methods=["POST"])
+def job_create():
+    """
+    Enqueues an export job and returns 202 with its id. Takes the same form fields as
+    /run-selected (or export=<key> for one export); replay=1 rebuilds from stored payloads,
+    full=1 drops the incremental sync state first, so deletions in Unleashed are picked up.
+    """
+    selected = request.form.getlist("exports") or [k for k in [request.form.get("export")] if k]
+    selected = [key for key in selected if key in EXPORTS]
+    if not selected:
+        return {"error": "No exports selected"}, 400
+
+    fmt = request.form.get("format", "xlsx")
+    if fmt not in formats.FORMATS:
+        return {"error": "Invalid format"}, 400
+    if not formats.is_available(fmt):
+        return {"error": f"Format {fmt} is not available on this server"}, 400
+
+    replay = request.form.get("replay") == "1"
+    if len(selected) == 1:
+        name = selected[0]
+    else:
+        name = "unleashed_replay" if replay else "unleashed_exports"
+    mimetype, filename = _download_meta(selected, fmt, name)
+    options = {
+        "replay": replay,
+        "run_id": (request.form.get("run_id") or "").strip() or None,
+        "full_sync": request.form.get("full") == "1",
+    }
+
+    job = jobs_manager.submit(selected, fmt, filename, mimetype, options=options)
+    return _job_view(job), 202, {"Location": f"/jobs/{job['id']}"}
+
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "exports": [
+            {"key": key, "label": EXPORTS.get(key, {}).get("label", key), **job["progress"].get(key, {})}
+            for key in job["keys"]
+        ],
+        "format": job["format"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "status_url": f"/jobs/{job['id']}",
+        "download_url": f"/jobs/{job['id']}/download" if job["status"] == "succeeded" else None,
+    }
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id: str):
+    job = jobs_manager.get(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    return _job_view(job)
+
+
+@app.route("/jobs/<job_id>/download")
+def job_download(job_id: str):
+    job = jobs_manager.get(job_id)
+    if job is None:
+        return "Unknown job", 404
+    if job["status"] != "succeeded":
+        return f"Job is {job['status']}", 409
+    path = jobs_manager.output_path(job)
+    if not os.path.isfile(path):
+        return "Job output has expired", 410
+    return send_file(path, mimetype=job["mimetype"], as_attachment=True, download_name=job["download_name"])
 
 
 @app.route("/schedule/add", methods=["POST"])
@@ -340,7 +854,10 @@ def schedule_add():
     valid_keys = {r["key"] for r in DASHBOARD_REPORTS}
     if not report_key or report_key not in valid_keys:
         return "Invalid report", 400
-    add_schedule(report_key, frequency)
+    # the scheduler never runs any other frequency
+    if frequency.lower() not in FREQUENCIES:
+        return "Invalid frequency", 400
+    add_schedule(report_key, frequency.lower())
     return redirect("/")
 
 
@@ -12,8 +12,208 @@ class Config:
 
     USE_UNLEASHED_API = os.getenv("USE_UNLEASHED_API", "false").lower() == "true"
 
+    # pull only rows changed since the last run (modifiedSince) and merge into the stored snapshot
+    INCREMENTAL_SYNC = os.getenv("INCREMENTAL_SYNC", "false").lower() == "true"
+
+    # with incremental sync, re-pull an endpoint in full this often so rows deleted in
+    # Unleashed drop out (deltas never show deletions); 0 disables
+    _raw_full_sync_hours = os.getenv("SYNC_FULL_EVERY_HOURS", "168")
+    try:
+        SYNC_FULL_EVERY_HOURS = max(float(_raw_full_sync_hours), 0.0)
+    except ValueError:
+        SYNC_FULL_EVERY_HOURS = 168.0
+
     _raw_timeout = os.getenv("REQUEST_TIMEOUT_SECONDS", "30")
     try:
         REQUEST_TIMEOUT_SECONDS = int(_raw_timeout)
     except ValueError:
         REQUEST_TIMEOUT_SECONDS = 30
+
+    _raw_page_size = os.getenv("UNLEASHED_PAGE_SIZE", "200")
+    try:
+        UNLEASHED_PAGE_SIZE = int(_raw_page_size)
+    except ValueError:
+        UNLEASHED_PAGE_SIZE = 200
+
+    _raw_page_workers = os.getenv("UNLEASHED_PAGE_WORKERS", "4")
+    try:
+        UNLEASHED_PAGE_WORKERS = max(int(_raw_page_workers), 1)
+    except ValueError:
+        UNLEASHED_PAGE_WORKERS = 4
+
+    _raw_pool_size = os.getenv("UNLEASHED_POOL_SIZE", "10")
+    try:
+        UNLEASHED_POOL_SIZE = max(int(_raw_pool_size), 1)
+    except ValueError:
+        UNLEASHED_POOL_SIZE = 10
+
+    # requests/second across all callers of the client; 0 disables the limiter
+    _raw_rate_limit = os.getenv("UNLEASHED_RATE_LIMIT_PER_SECOND", "5")
+    try:
+        UNLEASHED_RATE_LIMIT_PER_SECOND = max(float(_raw_rate_limit), 0.0)
+    except ValueError:
+        UNLEASHED_RATE_LIMIT_PER_SECOND = 5.0
+
+    _raw_max_retries = os.getenv("UNLEASHED_MAX_RETRIES", "5")
+    try:
+        UNLEASHED_MAX_RETRIES = max(int(_raw_max_retries), 0)
+    except ValueError:
+        UNLEASHED_MAX_RETRIES = 5
+
+    # exports run concurrently by build_workbook; 1 runs them one after another
+    _raw_export_workers = os.getenv("EXPORT_WORKERS", "4")
+    try:
+        EXPORT_WORKERS = max(int(_raw_export_workers), 1)
+    except ValueError:
+        EXPORT_WORKERS = 4
+
+    # rows each parallel export may run ahead of the sheet/file being written
+    _raw_prefetch_rows = os.getenv("EXPORT_PREFETCH_ROWS", "20000")
+    try:
+        EXPORT_PREFETCH_ROWS = max(int(_raw_prefetch_rows), 1)
+    except ValueError:
+        EXPORT_PREFETCH_ROWS = 20000
+
+    # rows sampled to size XLSX columns; 0 sizes from every row (buffers the whole sheet)
+    _raw_width_sample = os.getenv("XLSX_WIDTH_SAMPLE_ROWS", "1000")
+    try:
+        XLSX_WIDTH_SAMPLE_ROWS = max(int(_raw_width_sample), 0)
+    except ValueError:
+        XLSX_WIDTH_SAMPLE_ROWS = 1000
+
+    _raw_drain_timeout = os.getenv("RAW_DRAIN_TIMEOUT_SECONDS", "120")
+    try:
+        RAW_DRAIN_TIMEOUT_SECONDS = float(_raw_drain_timeout)
+    except ValueError:
+        RAW_DRAIN_TIMEOUT_SECONDS = 120.0
+
+    # idle Azure SQL connections kept open for reuse (each new one is a TLS + login round trip)
+    _raw_sql_pool_size = os.getenv("AZURE_SQL_POOL_SIZE", "4")
+    try:
+        AZURE_SQL_POOL_SIZE = max(int(_raw_sql_pool_size), 0)
+    except ValueError:
+        AZURE_SQL_POOL_SIZE = 4
+
+    # pooled connections are replaced after this long, and checked with SELECT 1 after sitting idle this long
+    _raw_sql_pool_max_age = os.getenv("AZURE_SQL_POOL_MAX_AGE_SECONDS", "1800")
+    try:
+        AZURE_SQL_POOL_MAX_AGE_SECONDS = max(float(_raw_sql_pool_max_age), 0.0)
+    except ValueError:
+        AZURE_SQL_POOL_MAX_AGE_SECONDS = 1800.0
+
+    _raw_sql_pool_ping = os.getenv("AZURE_SQL_POOL_PING_AFTER_IDLE_SECONDS", "30")
+    try:
+        AZURE_SQL_POOL_PING_AFTER_IDLE_SECONDS = max(float(_raw_sql_pool_ping), 0.0)
+    except ValueError:
+        AZURE_SQL_POOL_PING_AFTER_IDLE_SECONDS = 30.0
+
+    # raw.api_payload rows buffered before one executemany + commit
+    _raw_payload_batch_size = os.getenv("RAW_PAYLOAD_BATCH_SIZE", "50")
+    try:
+        RAW_PAYLOAD_BATCH_SIZE = max(int(_raw_payload_batch_size), 1)
+    except ValueError:
+        RAW_PAYLOAD_BATCH_SIZE = 50
+
+    # response body bytes (and payloads) waiting for the background raw payload writer;
+    # once either is reached the export blocks (backpressure)
+    _raw_queue_max_mb = os.getenv("RAW_QUEUE_MAX_MB", "64")
+    try:
+        RAW_QUEUE_MAX_MB = max(int(_raw_queue_max_mb), 1)
+    except ValueError:
+        RAW_QUEUE_MAX_MB = 64
+
+    _raw_queue_max_size = os.getenv("RAW_QUEUE_MAX_SIZE", "200")
+    try:
+        RAW_QUEUE_MAX_SIZE = max(int(_raw_queue_max_size), 1)
+    except ValueError:
+        RAW_QUEUE_MAX_SIZE = 200
+
+    # how long an export waits on a full raw payload queue before the payload is dropped
+    _raw_queue_put_timeout = os.getenv("RAW_QUEUE_PUT_TIMEOUT_SECONDS", "30")
+    try:
+        RAW_QUEUE_PUT_TIMEOUT_SECONDS = max(float(_raw_queue_put_timeout), 0.0)
+    except ValueError:
+        RAW_QUEUE_PUT_TIMEOUT_SECONDS = 30.0
+
+    # local file store for /replay-selected instead of raw.api_payload (see replay.FilePayloadSource)
+    REPLAY_DIR = os.getenv("REPLAY_DIR", "")
+
+    # local analytics store the exports are loaded into (see analytics_store.py); off unless enabled
+    ANALYTICS_STORE_ENABLED = os.getenv("ANALYTICS_STORE_ENABLED", "false").lower() == "true"
+    ANALYTICS_STORE_PATH = os.getenv("ANALYTICS_STORE_PATH", "")
+    # "auto" (DuckDB when installed, else SQLite), "duckdb" or "sqlite"
+    ANALYTICS_STORE_ENGINE = os.getenv("ANALYTICS_STORE_ENGINE", "auto").lower()
+
+    # recompute the materialised dashboard reports (see reports.py) after each successful run
+    REPORT_REFRESH_AFTER_RUN = os.getenv("REPORT_REFRESH_AFTER_RUN", "true").lower() == "true"
+
+    # on-disk cache of API responses (see response_cache.py); off unless enabled
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+
+    _raw_cache_ttl = os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300")
+    try:
+        RESPONSE_CACHE_TTL_SECONDS = max(float(_raw_cache_ttl), 0.0)
+    except ValueError:
+        RESPONSE_CACHE_TTL_SECONDS = 300.0
+
+    # per-endpoint overrides, "Endpoint=seconds,..."; 0 never caches that endpoint
+    RESPONSE_CACHE_ENDPOINT_TTLS = os.getenv(
+        "RESPONSE_CACHE_ENDPOINT_TTLS",
+        "Warehouses=43200,Products=21600,Suppliers=21600,Customers=3600",
+    )
+
+    _raw_cache_max_mb = os.getenv("RESPONSE_CACHE_MAX_MB", "512")
+    try:
+        RESPONSE_CACHE_MAX_MB = max(int(_raw_cache_max_mb), 1)
+    except ValueError:
+        RESPONSE_CACHE_MAX_MB = 512
+
+    # background export jobs (POST /jobs) run on this many threads per process
+    _raw_job_workers = os.getenv("EXPORT_JOB_WORKERS", "2")
+    try:
+        EXPORT_JOB_WORKERS = max(int(_raw_job_workers), 1)
+    except ValueError:
+        EXPORT_JOB_WORKERS = 2
+
+    # finished jobs (state and output file) are removed after this long
+    _raw_job_retention = os.getenv("EXPORT_JOB_RETENTION_HOURS", "24")
+    try:
+        EXPORT_JOB_RETENTION_HOURS = max(float(_raw_job_retention), 0.0)
+    except ValueError:
+        EXPORT_JOB_RETENTION_HOURS = 24.0
+
+    # in-process executor for dashboard schedules (see scheduler.py); off unless enabled
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
+
+    _raw_scheduler_concurrency = os.getenv("SCHEDULER_MAX_CONCURRENT", "1")
+    try:
+        SCHEDULER_MAX_CONCURRENT = max(int(_raw_scheduler_concurrency), 1)
+    except ValueError:
+        SCHEDULER_MAX_CONCURRENT = 1
+
+    _raw_scheduler_poll = os.getenv("SCHEDULER_POLL_SECONDS", "60")
+    try:
+        SCHEDULER_POLL_SECONDS = max(float(_raw_scheduler_poll), 1.0)
+    except ValueError:
+        SCHEDULER_POLL_SECONDS = 60.0
+
+    # off-peak slot: scheduled runs start at this hour (UTC), weekly ones on this weekday (0 = Monday)
+    _raw_run_hour = os.getenv("SCHEDULE_RUN_HOUR_UTC", "2")
+    try:
+        SCHEDULE_RUN_HOUR_UTC = min(max(int(_raw_run_hour), 0), 23)
+    except ValueError:
+        SCHEDULE_RUN_HOUR_UTC = 2
+
+    _raw_weekday = os.getenv("SCHEDULE_WEEKDAY", "0")
+    try:
+        SCHEDULE_WEEKDAY = min(max(int(_raw_weekday), 0), 6)
+    except ValueError:
+        SCHEDULE_WEEKDAY = 0
+
+    # each schedule starts up to this many minutes after the slot, so they don't all start at once
+    _raw_jitter = os.getenv("SCHEDULE_JITTER_MINUTES", "30")
+    try:
+        SCHEDULE_JITTER_MINUTES = max(float(_raw_jitter), 0.0)
+    except ValueError:
+        SCHEDULE_JITTER_MINUTES = 30.0
@@ -1,13 +1,23 @@
 import os
 import json
 import uuid
+import queue
+import atexit
 import hashlib
-from typing import Any, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 import pyodbc
 
+from payload_codec import compress, decode_payload, resolve_codec
+
 load_dotenv()
 
+# after load_dotenv, so Config sees the .env values
+from config import Config  # noqa: E402
+
 SERVER = os.environ["AZURE_SQL_SERVER"]
 DB = os.environ["AZURE_SQL_DB"]
 USER = os.environ["AZURE_SQL_USER"]
@@ -24,15 +34,376 @@ CONN_STR = (
     "Connection Timeout=30;"
 )
 
+# skip storing a page whose JSON is identical to the last stored copy of the same page;
+# a reference row (payload_json NULL, same payload_hash) still links it to the run.
+# Needs payload_json nullable; the latest-hash lookup uses _DEDUP_INDEX_SQL (created on first use)
+RAW_PAYLOAD_DEDUP = os.getenv("RAW_PAYLOAD_DEDUP", "false").lower() == "true"
+# "gzip" or "zstd" stores payloads in payload_compressed instead of payload_json (see payload_codec)
+RAW_PAYLOAD_CODEC = resolve_codec(os.getenv("RAW_PAYLOAD_COMPRESSION", ""))
+
+_INSERT_RAW_PAYLOAD_SQL = """
+    INSERT INTO raw.api_payload
+      (run_id, company_id, endpoint, http_status, page_number, api_cursor, request_url, payload_json, payload_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_RAW_PAYLOAD_COMPRESSED_SQL = """
+    INSERT INTO raw.api_payload
+      (run_id, company_id, endpoint, http_status, page_number, api_cursor, request_url, payload_json, payload_hash,
+       payload_compressed, payload_codec)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# whether raw.api_payload has the compression columns; probed once (only a True result is kept)
+_compressed_columns: Optional[bool] = None
+
+
+def _has_compressed_columns(cur: pyodbc.Cursor) -> bool:
+    """
+    Reads must look at payload_compressed whenever the column exists, not only while
+    compression is configured: rows written compressed stay compressed after it is turned off.
+    """
+    global _compressed_columns
+    if _compressed_columns is None:
+        cur.execute("SELECT COL_LENGTH('raw.api_payload', 'payload_compressed')")
+        if cur.fetchone()[0] is None:
+            return False
+        _compressed_columns = True
+    return _compressed_columns
+
+
+def _has_payload_sql(cur: pyodbc.Cursor) -> str:
+    """WHERE clause: the row holds a full payload (it is not a dedup reference)."""
+    if _has_compressed_columns(cur):
+        return "(payload_json IS NOT NULL OR payload_compressed IS NOT NULL)"
+    return "payload_json IS NOT NULL"
+
+
+def _payload_columns(cur: pyodbc.Cursor) -> str:
+    """Always (payload_json, payload_hash, payload_compressed, payload_codec), NULLs where the table has no such column."""
+    if _has_compressed_columns(cur):
+        return "payload_json, payload_hash, payload_compressed, payload_codec"
+    return "payload_json, payload_hash, NULL AS payload_compressed, NULL AS payload_codec"
+
 def _sha256_bytes(s: str) -> bytes:
     return hashlib.sha256(s.encode("utf-8")).digest()
 
 def get_conn() -> pyodbc.Connection:
     return pyodbc.connect(CONN_STR)
 
+
+class ConnectionPool:
+    """
+    Keeps up to max_idle open connections for reuse across statements and threads.
+    A connection that raised a pyodbc.Error is closed rather than returned to the pool.
+
+    Azure SQL drops connections that sit idle, so one idle for ping_after_idle seconds is
+    checked with SELECT 1 before it is handed out, and any connection older than
+    max_age seconds is replaced; a dead one is closed and the next (or a new) one used.
+    """
+
+    def __init__(self, conn_str: str, max_idle: int = 4, max_age: float = 1800.0, ping_after_idle: float = 30.0):
+        self._conn_str = conn_str
+        self.max_age = max_age
+        self.ping_after_idle = ping_after_idle
+        # (connection, opened_at, released_at), monotonic seconds
+        self._idle: "queue.LifoQueue[Tuple[pyodbc.Connection, float, float]]" = queue.LifoQueue(
+            maxsize=max(max_idle, 1)
+        )
+        self.discarded = 0
+
+    def _usable(self, conn: pyodbc.Connection, opened_at: float, released_at: float) -> bool:
+        now = time.monotonic()
+        if now - opened_at > self.max_age:
+            return False
+        if now - released_at < self.ping_after_idle:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+        except pyodbc.Error:
+            return False
+        return True
+
+    @staticmethod
+    def _close(conn: pyodbc.Connection) -> None:
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    def _acquire(self) -> Tuple[pyodbc.Connection, float]:
+        while True:
+            try:
+                conn, opened_at, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return pyodbc.connect(self._conn_str), time.monotonic()
+            if self._usable(conn, opened_at, released_at):
+                return conn, opened_at
+            self.discarded += 1
+            self._close(conn)
+
+    def _release(self, conn: pyodbc.Connection, opened_at: float) -> None:
+        try:
+            self._idle.put_nowait((conn, opened_at, time.monotonic()))
+        except queue.Full:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[pyodbc.Connection]:
+        conn, opened_at = self._acquire()
+        try:
+            yield conn
+        except pyodbc.Error:
+            self._close(conn)
+            raise
+        except Exception:
+            conn.rollback()
+            self._release(conn, opened_at)
+            raise
+        self._release(conn, opened_at)
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+
+_pool = ConnectionPool(
+    CONN_STR,
+    max_idle=Config.AZURE_SQL_POOL_SIZE,
+    max_age=Config.AZURE_SQL_POOL_MAX_AGE_SECONDS,
+    ping_after_idle=Config.AZURE_SQL_POOL_PING_AFTER_IDLE_SECONDS,
+)
+atexit.register(_pool.close_all)
+
+
+def pooled_conn():
+    return _pool.connection()
+
+
+PageKey = Tuple[Optional[str], str, Optional[int]]
+
+# covers PayloadHashIndex.latest (TOP 1 ... ORDER BY payload_id DESC per page), which
+# otherwise scans raw.api_payload once per page; ONLINE so running inserts are not blocked
+_DEDUP_INDEX_SQL = """
+    IF NOT EXISTS (
+        SELECT 1 FROM sys.indexes
+        WHERE name = 'IX_api_payload_page_latest' AND object_id = OBJECT_ID('raw.api_payload')
+    )
+    CREATE NONCLUSTERED INDEX IX_api_payload_page_latest
+        ON raw.api_payload (company_id, endpoint, page_number, payload_id DESC)
+        INCLUDE (payload_hash)
+        WITH (ONLINE = ON)
+"""
+
+
+class PayloadHashIndex:
+    """
+    Latest stored payload_hash per (company_id, endpoint, page_number).
+    Misses are looked up once in raw.api_payload; hashes are only remembered after
+    their full row has been committed, so a reference never points at a lost write.
+    The first lookup makes sure the covering index exists (_DEDUP_INDEX_SQL).
+    """
+
+    def __init__(self):
+        self._hashes: Dict[PageKey, Optional[bytes]] = {}
+        self._lock = threading.Lock()
+        self._index_checked = False
+        self.index_error: Optional[str] = None
+
+        self.skipped = 0
+        self.bytes_saved = 0
+        self._by_run: Dict[str, Tuple[int, int]] = {}
+
+    def latest(self, key: PageKey) -> Optional[bytes]:
+        with self._lock:
+            if key in self._hashes:
+                return self._hashes[key]
+
+        company_id, endpoint, page_number = key
+        with pooled_conn() as conn:
+            cur = conn.cursor()
+            self._ensure_index(conn, cur)
+            cur.execute(f"""
+                SELECT TOP 1 payload_hash
+                FROM raw.api_payload
+                WHERE company_id = ? AND endpoint = ? AND page_number = ? AND {_has_payload_sql(cur)}
+                ORDER BY payload_id DESC
+            """, company_id, endpoint, page_number)
+            row = cur.fetchone()
+        payload_hash = bytes(row[0]) if row and row[0] is not None else None
+
+        with self._lock:
+            self._hashes.setdefault(key, payload_hash)
+            return self._hashes[key]
+
+    def _ensure_index(self, conn: pyodbc.Connection, cur: pyodbc.Cursor) -> None:
+        # once per process; without the permission to create it the lookups still work, only slower
+        with self._lock:
+            if self._index_checked:
+                return
+            self._index_checked = True
+        try:
+            cur.execute(_DEDUP_INDEX_SQL)
+            conn.commit()
+        except pyodbc.Error as e:
+            conn.rollback()
+            self.index_error = str(e)
+
+    def remember_rows(self, rows: List[Tuple[Any, ...]]) -> None:
+        with self._lock:
+            for row in rows:
+                if row[7] is not None or row[9] is not None:
+                    self._hashes[(row[1], row[2], row[4])] = row[8]
+
+    def record_skip(self, run_id: str, nbytes: int) -> None:
+        with self._lock:
+            self.skipped += 1
+            self.bytes_saved += nbytes
+            skipped, saved = self._by_run.get(run_id, (0, 0))
+            self._by_run[run_id] = (skipped + 1, saved + nbytes)
+
+    def pop_run(self, run_id: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._by_run.pop(run_id, (0, 0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": RAW_PAYLOAD_DEDUP,
+                "pages_skipped": self.skipped,
+                "bytes_saved": self.bytes_saved,
+                "indexed_pages": len(self._hashes),
+                "index_error": self.index_error,
+            }
+
+
+_hash_index = PayloadHashIndex()
+
+
+def raw_dedup_stats() -> Dict[str, Any]:
+    return _hash_index.stats()
+
+
+class RawPayloadWriter:
+    """
+    Buffers raw.api_payload rows and writes each batch with one fast executemany
+    and a single commit, instead of a connection + transaction per payload.
+    Written/failed rows and their latency (queued -> committed) are counted per batch,
+    when the batch is actually written.
+    """
+
+    def __init__(self, batch_size: int = 50):
+        self.batch_size = max(batch_size, 1)
+        self._rows: List[Tuple[Any, ...]] = []
+        self._enqueued: List[float] = []
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.failed_batches = 0
+        self.written = 0
+        self.failed = 0
+        self.total_latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    def _take(self) -> Tuple[List[Tuple[Any, ...]], List[float]]:
+        # caller holds self._lock
+        rows, enqueued = self._rows, self._enqueued
+        self._rows, self._enqueued = [], []
+        return rows, enqueued
+
+    def add(self, row: Tuple[Any, ...], enqueued_at: Optional[float] = None) -> None:
+        """enqueued_at: time.monotonic() when the payload was first queued (default: now)."""
+        with self._lock:
+            self._rows.append(row)
+            self._enqueued.append(time.monotonic() if enqueued_at is None else enqueued_at)
+            if len(self._rows) < self.batch_size:
+                return
+            rows, enqueued = self._take()
+        self._write(rows, enqueued)
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, enqueued = self._take()
+        if rows:
+            self._write(rows, enqueued)
+
+    def _write(self, rows: List[Tuple[Any, ...]], enqueued: List[float]) -> None:
+        try:
+            self._execute(rows)
+        except Exception as e:
+            self._record(enqueued, ok=False, error=str(e))
+            raise
+        self._record(enqueued, ok=True)
+        _hash_index.remember_rows(rows)
+
+    def _record(self, enqueued: List[float], ok: bool, error: Optional[str] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.batches += 1
+            if not ok:
+                self.failed_batches += 1
+                self.failed += len(enqueued)
+                self.last_error = error
+                return
+            self.written += len(enqueued)
+            self.total_latency_seconds += sum(now - t for t in enqueued)
+            self.max_latency_seconds = max(self.max_latency_seconds, now - min(enqueued))
+
+    @staticmethod
+    def _execute(rows: List[Tuple[Any, ...]]) -> None:
+        # rows always carry the two compression columns; plain mode leaves them off
+        # so tables without those columns keep working
+        if RAW_PAYLOAD_CODEC:
+            sql, params = _INSERT_RAW_PAYLOAD_COMPRESSED_SQL, rows
+        else:
+            sql, params = _INSERT_RAW_PAYLOAD_SQL, [row[:9] for row in rows]
+
+        with pooled_conn() as conn:
+            cur = conn.cursor()
+            cur.fast_executemany = True
+            cur.executemany(sql, params)
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "buffered": len(self._rows),
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "written": self.written,
+                "failed": self.failed,
+                "avg_latency_seconds": (self.total_latency_seconds / self.written) if self.written else None,
+                "max_latency_seconds": self.max_latency_seconds,
+                "last_error": self.last_error,
+            }
+
+
+_raw_writer = RawPayloadWriter(batch_size=Config.RAW_PAYLOAD_BATCH_SIZE)
+
+
+def flush_raw_payloads() -> None:
+    _raw_writer.flush()
+
+
+def raw_writer_stats() -> Dict[str, Any]:
+    return _raw_writer.stats()
+
+
+# registered after the pool, so it runs before the pool is closed
+atexit.register(flush_raw_payloads)
+
+
 def start_run(company_id: Optional[str] = None) -> str:
     run_id = str(uuid.uuid4())
-    with get_conn() as conn:
+    with pooled_conn() as conn:
         cur = conn.cursor()
         cur.execute(
             "INSERT INTO dbo.etl_run (run_id, company_id, status) VALUES (?, ?, ?)",
@@ -42,7 +413,20 @@ def start_run(company_id: Optional[str] = None) -> str:
     return run_id
 
 def finish_run(run_id: str, status: str, notes: Optional[str] = None) -> None:
-    with get_conn() as conn:
+    # payloads still buffered belong to this (or a concurrent) run: write them first.
+    # raw storage is best-effort, so a failed flush is noted rather than raised.
+    try:
+        flush_raw_payloads()
+    except Exception as e:
+        flush_note = f"raw payload flush failed: {e}"
+        notes = f"{notes}; {flush_note}" if notes else flush_note
+
+    skipped, saved = _hash_index.pop_run(run_id)
+    if skipped:
+        dedup_note = f"dedup: {skipped} unchanged page(s) referenced, {saved} bytes not stored"
+        notes = f"{notes}; {dedup_note}" if notes else dedup_note
+
+    with pooled_conn() as conn:
         cur = conn.cursor()
         cur.execute("""
             UPDATE dbo.etl_run
@@ -62,17 +446,102 @@ def insert_raw_payload(
     request_url: Optional[str] = None,
     page_number: Optional[int] = None,
     api_cursor: Optional[str] = None,
+    enqueued_at: Optional[float] = None,
 ) -> None:
+    """
+    Queues one payload row; it is written with its batch or on flush_raw_payloads/finish_run.
+    enqueued_at (time.monotonic()) dates the payload for the writer's latency stats.
+    """
     payload_json = json.dumps(payload_obj, ensure_ascii=False)
     payload_hash = _sha256_bytes(payload_json)
 
-    with get_conn() as conn:
+    payload_compressed = None
+    payload_codec = None
+    if RAW_PAYLOAD_DEDUP and _hash_index.latest((company_id, endpoint, page_number)) == payload_hash:
+        _hash_index.record_skip(run_id, len(payload_json.encode("utf-8")))
+        payload_json = None
+    elif RAW_PAYLOAD_CODEC:
+        # payload_hash stays the hash of the JSON text, so dedup works across storage modes
+        payload_compressed = compress(payload_json, RAW_PAYLOAD_CODEC)
+        payload_codec = RAW_PAYLOAD_CODEC
+        payload_json = None
+
+    _raw_writer.add(
+        (
+            run_id, company_id, endpoint, http_status, page_number, api_cursor, request_url, payload_json, payload_hash,
+            payload_compressed, payload_codec,
+        ),
+        enqueued_at=enqueued_at,
+    )
+
+
+def _decode_stored(cur: pyodbc.Cursor, row: Any) -> Optional[Any]:
+    """
+    Decodes a (_payload_columns) row. Reference rows (dedup) resolve to the latest
+    full row with the same payload_hash.
+    """
+    if row[0] is None and row[2] is None:
+        cur.execute(f"""
+            SELECT TOP 1 {_payload_columns(cur)}
+            FROM raw.api_payload
+            WHERE payload_hash = ? AND {_has_payload_sql(cur)}
+            ORDER BY payload_id DESC
+        """, row[1])
+        row = cur.fetchone()
+        if row is None:
+            return None
+
+    return decode_payload(row[0], row[2], row[3])
+
+
+def read_raw_payload(payload_id: int) -> Optional[Any]:
+    """Decoded payload of one raw.api_payload row, whether stored as JSON, compressed or as a reference."""
+    with pooled_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {_payload_columns(cur)} FROM raw.api_payload WHERE payload_id = ?", payload_id)
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return _decode_stored(cur, row)
+
+
+def latest_successful_run_id(endpoint: str, company_id: Optional[str] = None) -> Optional[str]:
+    """
+    Latest successful run that stored a full pull of the endpoint. Incremental runs are
+    skipped: their pages (requested with modifiedSince) hold only the changed rows.
+    """
+    with pooled_conn() as conn:
         cur = conn.cursor()
         cur.execute("""
-            INSERT INTO raw.api_payload
-              (run_id, company_id, endpoint, http_status, page_number, api_cursor, request_url, payload_json, payload_hash)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, run_id, company_id, endpoint, http_status, page_number, api_cursor, request_url, payload_json, payload_hash)
-        conn.commit()
+            SELECT TOP 1 p.run_id
+            FROM raw.api_payload p
+            JOIN dbo.etl_run r ON r.run_id = p.run_id
+            WHERE p.endpoint = ? AND r.status = 'SUCCESS' AND (? IS NULL OR p.company_id = ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM raw.api_payload d
+                  WHERE d.run_id = p.run_id AND d.endpoint = p.endpoint AND d.request_url LIKE '%modifiedSince=%'
+              )
+            ORDER BY p.payload_id DESC
+        """, endpoint, company_id, company_id)
+        row = cur.fetchone()
+    return row[0] if row else None
 
 
+def read_run_payloads(run_id: str, endpoint: str) -> List[Tuple[Optional[int], Any]]:
+    """(page_number, decoded payload) for every stored page of one endpoint in one run, in page order."""
+    with pooled_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT page_number, {_payload_columns(cur)}
+            FROM raw.api_payload
+            WHERE run_id = ? AND endpoint = ?
+            ORDER BY page_number, payload_id
+        """, run_id, endpoint)
+        rows = cur.fetchall()
+
+        pages = []
+        for row in rows:
+            payload = _decode_stored(cur, tuple(row[1:]))
+            if payload is not None:
+                pages.append((row[0], payload))
+    return pages
@@ -1,7 +1,9 @@
-from typing import Callable, Dict, Tuple, List, Any
+from typing import Callable, Dict, Tuple, List, Any, Iterable
 
 # Contract: every export returns (sheet_name, headers, rows)
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+# rows may be a lazy iterator: API exports yield transform(items) over a page stream,
+# so pages are fetched (and stored) only as rows are consumed, and only once.
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
 
 # type of function that can generate export
 ExportGenerator = Callable[[], ExportResult]
\ No newline at end of file
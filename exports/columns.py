@@ -0,0 +1,104 @@
+"""
+Column type inference for the typed outputs (Parquet/Arrow in formats.py, the local
+analytics store), so both agree on what a column holds.
+
+A column's kind is widened over every row it has seen, never fixed from a sample:
+ints and floats give "float"; any other mix, or an unknown type, gives "string".
+RowSpool buffers rows to an anonymous temp file while the kinds are widened, so a
+writer can pick its schema from all rows and still hold only one chunk in memory.
+"""
+import pickle
+import tempfile
+from datetime import date, datetime
+from typing import Any, Iterator, List, Optional, Sequence
+
+NULL = "null"
+BOOL = "bool"
+INT = "int"
+FLOAT = "float"
+DATETIME = "datetime"
+DATE = "date"
+STRING = "string"
+
+_KINDS = {bool: BOOL, int: INT, float: FLOAT, datetime: DATETIME, date: DATE, str: STRING}
+
+
+def value_kind(value: Any) -> str:
+    if value is None:
+        return NULL
+    return _KINDS.get(type(value), STRING)
+
+
+def widen_kind(a: str, b: str) -> str:
+    """The narrowest kind holding values of both a and b."""
+    if a == b or b == NULL:
+        return a
+    if a == NULL:
+        return b
+    if {a, b} == {INT, FLOAT}:
+        return FLOAT
+    return STRING
+
+
+def column_kinds(width: int, rows: Sequence[Sequence[Any]], kinds: Optional[List[str]] = None) -> List[str]:
+    """Per-column kinds over rows, widened from kinds when given; short rows count as None."""
+    kinds = list(kinds) if kinds is not None else [NULL] * width
+    for i in range(width):
+        kind = kinds[i]
+        for r in rows:
+            if i < len(r):
+                kind = widen_kind(kind, value_kind(r[i]))
+                if kind == STRING:
+                    break
+        kinds[i] = kind
+    return kinds
+
+
+class RowSpool:
+    """
+    Row chunks written aside while their column kinds are widened; chunks() reads them back
+    in order. The first chunk stays in memory, so a single-chunk export never touches disk.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.kinds: List[str] = [NULL] * width
+        self.rows = 0
+        self._first: Optional[List[List[Any]]] = None
+        self._file: Any = None
+
+    def __enter__(self) -> "RowSpool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def add(self, chunk: List[List[Any]]) -> None:
+        if not chunk:
+            return
+        self.kinds = column_kinds(self.width, chunk, self.kinds)
+        self.rows += len(chunk)
+        if self._first is None:
+            self._first = chunk
+            return
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(suffix=".spool")
+        pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def chunks(self) -> Iterator[List[List[Any]]]:
+        if self._first is not None:
+            yield self._first
+        if self._file is None:
+            return
+        self._file.seek(0)
+        while True:
+            try:
+                yield pickle.load(self._file)
+            except EOFError:
+                return
+
+    def close(self) -> None:
+        self._first = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,9 +1,35 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
-
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
+
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+COLUMNS = [
+    Col("CreditNoteNumber", "CreditNoteNumber"),
+    Col("CreditNoteDate", "CreditNoteDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("Status", "Status"),
+    Col("CustomerName", "Customer.CustomerName", fallback=True),
+    Col("CustomerCode", "Customer.CustomerCode"),
+    Col("CustomerGuid", "Customer.Guid"),
+    Col("Currency", "Currency.CurrencyCode", fallback=True),
+    Col("ExchangeRate", "ExchangeRate"),
+    Col("SubTotal", "SubTotal"),
+    Col("TaxTotal", "TaxTotal"),
+    Col("Total", "Total"),
+    Col("SalesOrderNumber", "SalesOrder.OrderNumber", fallback=True),
+    Col("SalesOrderGuid", "SalesOrder.Guid"),
+    Col("InvoiceNumber", "Invoice.InvoiceNumber", fallback=True),
+    Col("InvoiceGuid", "Invoice.Guid"),
+    Col("Guid", "Guid"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(COLUMNS)
+_extract = compile_extractor(COLUMNS)
+_converters = column_converters(COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,76 +39,20 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/CreditNotes")
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="CreditNotes",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
-    headers = [
-        "CreditNoteNumber",
-        "CreditNoteDate",
-        "Status",
-        "CustomerName",
-        "CustomerCode",
-        "CustomerGuid",
-        "Currency",
-        "ExchangeRate",
-        "SubTotal",
-        "TaxTotal",
-        "Total",
-        "SalesOrderNumber",
-        "SalesOrderGuid",
-        "InvoiceNumber",
-        "InvoiceGuid",
-        "Guid",
-        "LastModifiedOn",
-    ]
-
-    rows: List[List[Any]] = []
-
-    for cn in data.get("Items", []):
-        customer = cn.get("Customer")
-        currency = cn.get("Currency")
-        sales_order = cn.get("SalesOrder")
-        invoice = cn.get("Invoice")
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(map(_extract, items), _converters)
 
-        cust_name = customer.get("CustomerName") if isinstance(customer, dict) else customer
-        cust_code = customer.get("CustomerCode") if isinstance(customer, dict) else None
-        cust_guid = customer.get("Guid") if isinstance(customer, dict) else None
 
-        currency_code = currency.get("CurrencyCode") if isinstance(currency, dict) else currency
-
-        so_number = sales_order.get("OrderNumber") if isinstance(sales_order, dict) else sales_order
-        so_guid = sales_order.get("Guid") if isinstance(sales_order, dict) else None
-
-        inv_number = invoice.get("InvoiceNumber") if isinstance(invoice, dict) else invoice
-        inv_guid = invoice.get("Guid") if isinstance(invoice, dict) else None
-
-        rows.append([
-            cn.get("CreditNoteNumber"),
-            parse_unleashed_dotnet_date(cn.get("CreditNoteDate")),
-            cn.get("Status"),
-            cust_name,
-            cust_code,
-            cust_guid,
-            currency_code,
-            cn.get("ExchangeRate"),
-            cn.get("SubTotal"),
-            cn.get("TaxTotal"),
-            cn.get("Total"),
-            so_number,
-            so_guid,
-            inv_number,
-            inv_guid,
-            cn.get("Guid"),
-            parse_unleashed_dotnet_date(cn.get("LastModifiedOn")),
-        ])
-
-    return "CreditNotes", headers, rows
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/CreditNotes", endpoint="CreditNotes", run_id=run_id, company_id=company_id,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "CreditNotes", HEADERS, cached_transform("CreditNotes", items, page_hashes, transform)
@@ -0,0 +1,171 @@
+"""
+Non-Excel writers for the (sheet_name, headers, rows) export contract.
+CSV needs only the stdlib; Parquet and Arrow IPC need pyarrow (optional).
+"""
+import csv
+import gzip
+import io
+import zipfile
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List
+
+from exports import ExportResult, columns
+
+FORMATS: Dict[str, Dict[str, str]] = {
+    "xlsx": {
+        "label": "Excel (.xlsx)",
+        "extension": "xlsx",
+        "mimetype": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    },
+    "csv": {"label": "CSV", "extension": "csv", "mimetype": "text/csv"},
+    "csv.gz": {"label": "CSV (gzip)", "extension": "csv.gz", "mimetype": "application/gzip"},
+    "parquet": {"label": "Parquet", "extension": "parquet", "mimetype": "application/vnd.apache.parquet"},
+    "arrow": {"label": "Arrow IPC stream", "extension": "arrows", "mimetype": "application/vnd.apache.arrow.stream"},
+}
+
+ZIP_MIMETYPE = "application/zip"
+
+# rows converted to one Arrow record batch at a time
+ARROW_BATCH_ROWS = 10_000
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Parquet/Arrow output requires pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+def is_available(fmt: str) -> bool:
+    if fmt not in ("parquet", "arrow"):
+        return fmt in FORMATS
+    try:
+        _require_pyarrow()
+    except RuntimeError:
+        return False
+    return True
+
+
+def write_csv(f: BinaryIO, headers: List[str], rows: Iterable[List[Any]]) -> None:
+    text = io.TextIOWrapper(f, encoding="utf-8", newline="", write_through=True)
+    try:
+        writer = csv.writer(text)
+        writer.writerow(headers)
+        for r in rows:
+            writer.writerow(r)
+    finally:
+        # don't let the wrapper close the underlying file
+        text.detach()
+
+
+def write_csv_gz(f: BinaryIO, headers: List[str], rows: Iterable[List[Any]]) -> None:
+    with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+        write_csv(gz, headers, rows)
+
+
+def _arrow_type(pa, kind: str):
+    return {
+        columns.BOOL: pa.bool_(),
+        columns.INT: pa.int64(),
+        columns.FLOAT: pa.float64(),
+        columns.DATETIME: pa.timestamp("ms"),
+        columns.DATE: pa.date32(),
+    }.get(kind, pa.string())
+
+
+def _arrow_array(pa, values: List[Any], arrow_type):
+    if arrow_type == pa.string():
+        values = [None if v is None else str(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+
+def _record_batch(pa, headers: List[str], chunk: List[List[Any]], schema):
+    cols = [[r[i] if i < len(r) else None for r in chunk] for i in range(len(headers))]
+    return pa.record_batch([_arrow_array(pa, col, field.type) for col, field in zip(cols, schema)], schema=schema)
+
+
+def _iter_record_batches(headers: List[str], rows: Iterable[List[Any]]) -> Iterator[Any]:
+    """
+    Yields record batches of ARROW_BATCH_ROWS rows. Column types are widened over every
+    row (see exports.columns), so the rows are spooled to a temp file until the last one
+    is read; columns with no values (or mixed types) are written as strings.
+    """
+    pa = _require_pyarrow()
+    rows = iter(rows)
+    with columns.RowSpool(len(headers)) as spool:
+        while True:
+            chunk = list(islice(rows, ARROW_BATCH_ROWS))
+            if not chunk:
+                break
+            spool.add(chunk)
+
+        schema = pa.schema([(h, _arrow_type(pa, kind)) for h, kind in zip(headers, spool.kinds)])
+        if not spool.rows:
+            yield _record_batch(pa, headers, [], schema)
+            return
+        for chunk in spool.chunks():
+            yield _record_batch(pa, headers, chunk, schema)
+
+
+def write_parquet(f: BinaryIO, headers: List[str], rows: Iterable[List[Any]]) -> None:
+    pa = _require_pyarrow()
+    writer = None
+    try:
+        for batch in _iter_record_batches(headers, rows):
+            if writer is None:
+                writer = pa.parquet.ParquetWriter(f, batch.schema, compression="snappy")
+            if batch.num_rows:
+                writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_arrow(f: BinaryIO, headers: List[str], rows: Iterable[List[Any]]) -> None:
+    pa = _require_pyarrow()
+    writer = None
+    try:
+        for batch in _iter_record_batches(headers, rows):
+            if writer is None:
+                writer = pa.ipc.new_stream(f, batch.schema)
+            if batch.num_rows:
+                writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {
+    "csv": write_csv,
+    "csv.gz": write_csv_gz,
+    "parquet": write_parquet,
+    "arrow": write_arrow,
+}
+
+
+def filename_for(name: str, fmt: str) -> str:
+    return f"{name}.{FORMATS[fmt]['extension']}"
+
+
+def write_export(f: BinaryIO, result: ExportResult, fmt: str) -> None:
+    _, headers, rows = result
+    WRITERS[fmt](f, headers, rows)
+
+
+def write_zip(f: BinaryIO, results: Iterable[ExportResult], fmt: str) -> None:
+    """One member per export, each written straight into the archive."""
+    compression = zipfile.ZIP_STORED if fmt in ("csv.gz", "parquet") else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(f, "w", compression=compression) as zf:
+        seen = set()
+        for result in results:
+            name = filename_for(result[0], fmt)
+            suffix = 2
+            while name in seen:
+                name = filename_for(f"{result[0]}_{suffix}", fmt)
+                suffix += 1
+            seen.add(name)
+            with zf.open(name, "w", force_zip64=True) as member:
+                write_export(member, result, fmt)
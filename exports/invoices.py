@@ -1,9 +1,36 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
-
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
+
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+COLUMNS = [
+    Col("InvoiceNumber", "InvoiceNumber"),
+    Col("InvoiceDate", "InvoiceDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("DueDate", "DueDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("Status", "Status"),
+    Col("CustomerName", "Customer.CustomerName", fallback=True),
+    Col("CustomerCode", "Customer.CustomerCode"),
+    Col("CustomerGuid", "Customer.Guid"),
+    Col("Currency", "Currency.CurrencyCode", fallback=True),
+    Col("ExchangeRate", "ExchangeRate"),
+    Col("SubTotal", "SubTotal"),
+    Col("TaxTotal", "TaxTotal"),
+    Col("Total", "Total"),
+    Col("SalesOrderNumber", "SalesOrder.OrderNumber", fallback=True),
+    Col("SalesOrderGuid", "SalesOrder.Guid"),
+    Col("WarehouseName", "Warehouse.WarehouseName", fallback=True),
+    Col("WarehouseGuid", "Warehouse.Guid"),
+    Col("Guid", "Guid"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(COLUMNS)
+_extract = compile_extractor(COLUMNS)
+_converters = column_converters(COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,78 +40,20 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/Invoices")
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="Invoices",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
-    headers = [
-        "InvoiceNumber",
-        "InvoiceDate",
-        "DueDate",
-        "Status",
-        "CustomerName",
-        "CustomerCode",
-        "CustomerGuid",
-        "Currency",
-        "ExchangeRate",
-        "SubTotal",
-        "TaxTotal",
-        "Total",
-        "SalesOrderNumber",
-        "SalesOrderGuid",
-        "WarehouseName",
-        "WarehouseGuid",
-        "Guid",
-        "LastModifiedOn",
-    ]
-
-    rows: List[List[Any]] = []
-
-    for inv in data.get("Items", []):
-        customer = inv.get("Customer")
-        currency = inv.get("Currency")
-        sales_order = inv.get("SalesOrder")
-        warehouse = inv.get("Warehouse")
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(map(_extract, items), _converters)
 
-        cust_name = customer.get("CustomerName") if isinstance(customer, dict) else customer
-        cust_code = customer.get("CustomerCode") if isinstance(customer, dict) else None
-        cust_guid = customer.get("Guid") if isinstance(customer, dict) else None
 
-        currency_code = currency.get("CurrencyCode") if isinstance(currency, dict) else currency
-
-        so_number = sales_order.get("OrderNumber") if isinstance(sales_order, dict) else sales_order
-        so_guid = sales_order.get("Guid") if isinstance(sales_order, dict) else None
-
-        wh_name = warehouse.get("WarehouseName") if isinstance(warehouse, dict) else warehouse
-        wh_guid = warehouse.get("Guid") if isinstance(warehouse, dict) else None
-
-        rows.append([
-            inv.get("InvoiceNumber"),
-            parse_unleashed_dotnet_date(inv.get("InvoiceDate")),
-            parse_unleashed_dotnet_date(inv.get("DueDate")),
-            inv.get("Status"),
-            cust_name,
-            cust_code,
-            cust_guid,
-            currency_code,
-            inv.get("ExchangeRate"),
-            inv.get("SubTotal"),
-            inv.get("TaxTotal"),
-            inv.get("Total"),
-            so_number,
-            so_guid,
-            wh_name,
-            wh_guid,
-            inv.get("Guid"),
-            parse_unleashed_dotnet_date(inv.get("LastModifiedOn")),
-        ])
-
-    return "Invoices", headers, rows
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/Invoices", endpoint="Invoices", run_id=run_id, company_id=company_id,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "Invoices", HEADERS, cached_transform("Invoices", items, page_hashes, transform)
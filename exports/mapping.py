@@ -0,0 +1,104 @@
+"""
+Declarative column specs for exports, compiled once into a flat row extractor.
+
+    COLUMNS = [
+        Col("CustomerName", "Customer.CustomerName", fallback=True),
+        Col("CustomerGuid", "Customer.Guid"),
+        Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+    ]
+    extract = compile_extractor(COLUMNS)   # item -> [value, ...]
+    rows = convert_columns(map(extract, items), column_converters(COLUMNS))
+
+Paths are dotted keys into the item. A nested lookup through a value that is not a dict
+gives None, or with fallback=True the non-dict value itself (Unleashed sometimes sends
+e.g. Customer as a plain name instead of an object).
+
+compile_extractor generates straight-line Python for the whole row: each parent object
+is fetched and type-checked once, however many columns read from it.
+
+convert applies per value inside the extractor; convert_column takes a whole column
+(a list of values) and is applied by convert_columns to chunks of CHUNK_ROWS rows, so
+e.g. dates are parsed as arrays while rows still stream.
+"""
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Extractor = Callable[[Dict[str, Any]], List[Any]]
+ColumnConverter = Callable[[Sequence[Any]], List[Any]]
+
+# rows converted together by convert_columns
+CHUNK_ROWS = 2000
+
+
+@dataclass(frozen=True)
+class Col:
+    name: str
+    path: str
+    convert: Optional[Callable[[Any], Any]] = None
+    fallback: bool = False
+    convert_column: Optional[ColumnConverter] = None
+
+
+def headers(columns: Sequence[Col]) -> List[str]:
+    return [c.name for c in columns]
+
+
+def compile_extractor(columns: Sequence[Col]) -> Extractor:
+    namespace: Dict[str, Any] = {"_isinstance": isinstance, "_dict": dict}
+    lines: List[str] = []
+    parents: Dict[str, int] = {}
+
+    def parent_var(prefix: str) -> int:
+        # emits v<n> (raw value) and d<n> (the value if it is a dict, else None) for a prefix
+        if prefix in parents:
+            return parents[prefix]
+        head, _, key = prefix.rpartition(".")
+        source = f"item.get({key!r})" if not head else f"(d{parent_var(head)}.get({key!r}) if d{parent_var(head)} is not None else None)"
+        n = len(parents)
+        parents[prefix] = n
+        lines.append(f"    v{n} = {source}")
+        lines.append(f"    d{n} = v{n} if _isinstance(v{n}, _dict) else None")
+        return n
+
+    values: List[str] = []
+    for i, col in enumerate(columns):
+        head, _, leaf = col.path.rpartition(".")
+        if not head:
+            expr = f"item.get({leaf!r})"
+        else:
+            n = parent_var(head)
+            expr = f"(d{n}.get({leaf!r}) if d{n} is not None else {f'v{n}' if col.fallback else 'None'})"
+        if col.convert is not None:
+            namespace[f"_c{i}"] = col.convert
+            expr = f"_c{i}({expr})"
+        values.append(expr)
+
+    body = lines + ["    return ["] + [f"        {v}," for v in values] + ["    ]"]
+    source = "def extract(item):\n" + "\n".join(body) + "\n"
+    exec(compile(source, "<exports.mapping>", "exec"), namespace)
+
+    extract = namespace["extract"]
+    extract.__doc__ = source
+    return extract
+
+
+def column_converters(columns: Sequence[Col]) -> List[Tuple[int, ColumnConverter]]:
+    """(row index, converter) of the columns with convert_column."""
+    return [(i, c.convert_column) for i, c in enumerate(columns) if c.convert_column is not None]
+
+
+def convert_columns(rows: Iterable[List[Any]], converters: Sequence[Tuple[int, ColumnConverter]]) -> Iterator[List[Any]]:
+    """Applies whole-column converters to rows in place, CHUNK_ROWS rows at a time."""
+    rows = iter(rows)
+    if not converters:
+        yield from rows
+        return
+    while True:
+        chunk = list(islice(rows, CHUNK_ROWS))
+        if not chunk:
+            return
+        for i, convert in converters:
+            for r, value in zip(chunk, convert([r[i] for r in chunk])):
+                r[i] = value
+        yield from chunk
@@ -1,9 +1,30 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
-
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
+
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+COLUMNS = [
+    Col("ProductCode", "ProductCode"),
+    Col("ProductDescription", "ProductDescription"),
+    Col("Barcode", "Barcode"),
+    Col("IsObsolete", "IsObsolete"),
+    Col("IsComponent", "IsComponent"),
+    Col("DefaultPurchasePrice", "DefaultPurchasePrice"),
+    Col("DefaultSellPrice", "DefaultSellPrice"),
+    Col("AverageLandCost", "AverageLandCost"),
+    Col("ProductGroup", "ProductGroup.GroupName", fallback=True),
+    Col("UnitOfMeasure", "UnitOfMeasure.Name", fallback=True),
+    Col("Guid", "Guid"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(COLUMNS)
+_extract = compile_extractor(COLUMNS)
+_converters = column_converters(COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,55 +34,20 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/Products")
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="Products",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
-    headers = [
-        "ProductCode",
-        "ProductDescription",
-        "Barcode",
-        "IsObsolete",
-        "IsComponent",
-        "DefaultPurchasePrice",
-        "DefaultSellPrice",
-        "AverageLandCost",
-        "ProductGroup",
-        "UnitOfMeasure",
-        "Guid",
-        "LastModifiedOn",
-    ]
-
-    rows: List[List[Any]] = []
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(map(_extract, items), _converters)
 
-    for p in data.get("Items", []):
-        group = p.get("ProductGroup")
-        group_name = group.get("GroupName") if isinstance(group, dict) else group
 
-        uom = p.get("UnitOfMeasure")
-        uom_name = uom.get("Name") if isinstance(uom, dict) else uom
-
-        rows.append([
-            p.get("ProductCode"),
-            p.get("ProductDescription"),
-            p.get("Barcode"),
-            p.get("IsObsolete"),
-            p.get("IsComponent"),
-            p.get("DefaultPurchasePrice"),
-            p.get("DefaultSellPrice"),
-            p.get("AverageLandCost"),
-            group_name,
-            uom_name,
-            p.get("Guid"),
-            parse_unleashed_dotnet_date(p.get("LastModifiedOn")),
-        ])
-
-    return "Products", headers, rows
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/Products", endpoint="Products", run_id=run_id, company_id=company_id,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "Products", HEADERS, cached_transform("Products", items, page_hashes, transform)
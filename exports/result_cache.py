@@ -0,0 +1,178 @@
+"""
+Disk cache of transformed export rows, keyed by (export, source page hashes, transform version).
+
+With RESULT_CACHE_ENABLED the items of an export are buffered until every page has been
+read; if the same pages were transformed before by the same code, the stored rows are
+streamed from disk and the transform is skipped. Otherwise the rows are transformed and
+written to the cache as they are yielded.
+
+The transform version is a hash of the export module's source plus the shared mapping
+and date helpers, so editing a transform invalidates its entries automatically.
+Entries are pickled row chunks in data/cache/results/<key>.pkl, evicted oldest-first
+beyond RESULT_CACHE_MAX_MB.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "false").lower() == "true"
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache", "results"
+)
+_raw_max_mb = os.getenv("RESULT_CACHE_MAX_MB", "1024")
+try:
+    RESULT_CACHE_MAX_MB = max(int(_raw_max_mb), 1)
+except ValueError:
+    RESULT_CACHE_MAX_MB = 1024
+
+# rows per pickled chunk
+CHUNK_ROWS = 5000
+
+_SHARED_SOURCES = ("exports.mapping", "exports.utils")
+
+_versions: Dict[str, str] = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "uncacheable": 0, "stores": 0, "evictions": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def transform_version(module_name: str) -> str:
+    if module_name not in _versions:
+        digest = hashlib.sha256()
+        for name in (module_name,) + _SHARED_SOURCES:
+            module = sys.modules.get(name)
+            path = getattr(module, "__file__", None)
+            if not path or not os.path.isfile(path):
+                # no source to fingerprint: never reuse results across processes
+                digest.update(f"{name}:{id(module)}:{os.getpid()}".encode("utf-8"))
+                continue
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _versions[module_name] = digest.hexdigest()
+    return _versions[module_name]
+
+
+def cache_key(name: str, page_hashes: List[Optional[str]], version: str) -> Optional[str]:
+    if not page_hashes or any(h is None for h in page_hashes):
+        return None
+    digest = hashlib.sha256(f"{name}\n{version}\n".encode("utf-8"))
+    for h in page_hashes:
+        digest.update(h.encode("ascii"))
+    return digest.hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(RESULT_CACHE_DIR, key + ".pkl")
+
+
+def _read(path: str) -> Iterator[List[Any]]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def _write_through(path: str, rows: Iterable[List[Any]]) -> Iterator[List[Any]]:
+    """Yields rows while pickling them; the entry only appears once every row was written."""
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=RESULT_CACHE_DIR, suffix=".tmp")
+    complete = False
+    try:
+        with os.fdopen(fd, "wb") as f:
+            rows = iter(rows)
+            while True:
+                chunk = list(islice(rows, CHUNK_ROWS))
+                if not chunk:
+                    break
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+                yield from chunk
+        os.replace(tmp, path)
+        complete = True
+        _count("stores")
+    finally:
+        # consumer stopped early or the transform failed: never keep a partial entry
+        if not complete and os.path.exists(tmp):
+            os.remove(tmp)
+    _evict()
+
+
+def _evict() -> None:
+    max_bytes = RESULT_CACHE_MAX_MB * 1024 * 1024
+    try:
+        entries = [e for e in os.scandir(RESULT_CACHE_DIR) if e.name.endswith(".pkl")]
+        sized = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in sized)
+    for _, size, path in sized:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        _count("evictions")
+
+
+def cached_transform(
+    name: str,
+    items: Iterable[Dict[str, Any]],
+    page_hashes: List[Optional[str]],
+    transform: Callable[[Iterable[Dict[str, Any]]], Iterable[List[Any]]],
+) -> Iterable[List[Any]]:
+    """
+    transform(items), served from the cache when the source pages are unchanged.
+    page_hashes must be the list iter_api_items fills while items is consumed.
+    """
+    if not RESULT_CACHE_ENABLED:
+        return transform(items)
+    return _cached_rows(name, items, page_hashes, transform)
+
+
+def _cached_rows(name, items, page_hashes, transform) -> Iterator[List[Any]]:
+    # the key needs every page hash, so the items are read in full before any row is yielded
+    buffered = list(items)
+    key = cache_key(name, page_hashes, transform_version(transform.__module__))
+    if key is None:
+        _count("uncacheable")
+        yield from transform(buffered)
+        return
+
+    path = _path(key)
+    try:
+        os.utime(path)  # keeps recently used entries out of eviction
+        rows = _read(path)
+        first = next(rows, None)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        first, rows = None, None
+    if rows is not None:
+        _count("hits")
+        del buffered
+        if first is not None:
+            yield first
+            yield from rows
+        return
+
+    _count("misses")
+    yield from _write_through(path, transform(buffered))
+
+
+def result_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+    stats["enabled"] = RESULT_CACHE_ENABLED
+    stats["dir"] = RESULT_CACHE_DIR
+    return stats
@@ -1,9 +1,51 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
 
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+ORDER_COLUMNS = [
+    Col("OrderNumber", "OrderNumber"),
+    Col("OrderDate", "OrderDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("RequiredDate", "RequiredDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("CompletedDate", "CompletedDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("ReceivedDate", "ReceivedDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("OrderStatus", "OrderStatus"),
+    Col("CustomerName", "Customer.CustomerName"),
+    Col("CustomerGuid", "Customer.Guid"),
+    Col("CustomerRef", "CustomerRef"),
+    Col("Warehouse", "Warehouse.WarehouseName"),
+    Col("WarehouseGuid", "Warehouse.Guid"),
+    Col("Currency", "Currency.CurrencyCode"),
+    Col("ExchangeRate", "ExchangeRate"),
+    Col("SubTotal", "SubTotal"),
+    Col("TaxTotal", "TaxTotal"),
+    Col("Total", "Total"),
+    Col("OrderGuid", "Guid"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+LINE_COLUMNS = [
+    Col("LineNumber", "LineNumber"),
+    Col("ProductCode", "Product.ProductCode"),
+    Col("ProductDescription", "Product.ProductDescription"),
+    Col("ProductGuid", "Product.Guid"),
+    Col("DueDate", "DueDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("OrderQuantity", "OrderQuantity"),
+    Col("UnitPrice", "UnitPrice"),
+    Col("LineTotal", "LineTotal"),
+    Col("LineTax", "LineTax"),
+    Col("LineGuid", "Guid"),
+    Col("LineLastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(ORDER_COLUMNS) + headers(LINE_COLUMNS)
+_extract_order = compile_extractor(ORDER_COLUMNS)
+_extract_line = compile_extractor(LINE_COLUMNS)
+_converters = column_converters(ORDER_COLUMNS + LINE_COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,87 +55,31 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/SalesOrders")
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(_rows(items), _converters)
 
-    # ✅ store raw response (side-effect) for replay/audit
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="SalesOrders",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
 
-    headers = [
-        "OrderNumber",
-        "OrderDate",
-        "RequiredDate",
-        "CompletedDate",
-        "ReceivedDate",
-        "OrderStatus",
-        "CustomerName",
-        "CustomerGuid",
-        "CustomerRef",
-        "Warehouse",
-        "WarehouseGuid",
-        "Currency",
-        "ExchangeRate",
-        "SubTotal",
-        "TaxTotal",
-        "Total",
-        "OrderGuid",
-        "LastModifiedOn",
-        "LineNumber",
-        "ProductCode",
-        "ProductDescription",
-        "ProductGuid",
-        "DueDate",
-        "OrderQuantity",
-        "UnitPrice",
-        "LineTotal",
-        "LineTax",
-        "LineGuid",
-        "LineLastModifiedOn",
-    ]
-
-    rows: List[List[Any]] = []
+def _rows(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    for order in items:
+        lines = order.get("SalesOrderLines")
+        if not lines:
+            continue
+        # order columns are the same on every line row: extract them once per order
+        head = _extract_order(order)
+        for line in lines:
+            yield head + _extract_line(line)
 
-    for order in data.get("Items", []):
-        for line in (order.get("SalesOrderLines") or []):
-            rows.append([
-                order.get("OrderNumber"),
-                parse_unleashed_dotnet_date(order.get("OrderDate")),
-                parse_unleashed_dotnet_date(order.get("RequiredDate")),
-                parse_unleashed_dotnet_date(order.get("CompletedDate")),
-                parse_unleashed_dotnet_date(order.get("ReceivedDate")),
-                order.get("OrderStatus"),
-                (order.get("Customer") or {}).get("CustomerName"),
-                (order.get("Customer") or {}).get("Guid"),
-                order.get("CustomerRef"),
-                (order.get("Warehouse") or {}).get("WarehouseName"),
-                (order.get("Warehouse") or {}).get("Guid"),
-                (order.get("Currency") or {}).get("CurrencyCode"),
-                order.get("ExchangeRate"),
-                order.get("SubTotal"),
-                order.get("TaxTotal"),
-                order.get("Total"),
-                order.get("Guid"),
-                parse_unleashed_dotnet_date(order.get("LastModifiedOn")),
-                line.get("LineNumber"),
-                (line.get("Product") or {}).get("ProductCode"),
-                (line.get("Product") or {}).get("ProductDescription"),
-                (line.get("Product") or {}).get("Guid"),
-                parse_unleashed_dotnet_date(line.get("DueDate")),
-                line.get("OrderQuantity"),
-                line.get("UnitPrice"),
-                line.get("LineTotal"),
-                line.get("LineTax"),
-                line.get("Guid"),
-                parse_unleashed_dotnet_date(line.get("LastModifiedOn")),
-            ])
 
-    return "SalesOrders", headers, rows
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/SalesOrders", endpoint="SalesOrders", run_id=run_id, company_id=company_id,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "SalesOrders", HEADERS, cached_transform("SalesOrders", items, page_hashes, transform)
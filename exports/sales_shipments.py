@@ -1,9 +1,32 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
-
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
+
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+COLUMNS = [
+    Col("ShipmentNumber", "ShipmentNumber"),
+    Col("ShipmentDate", "ShipmentDate", convert_column=parse_unleashed_dotnet_dates),
+    Col("ShipmentStatus", "ShipmentStatus"),
+    Col("SalesOrderNumber", "SalesOrder.OrderNumber", fallback=True),
+    Col("SalesOrderGuid", "SalesOrder.Guid"),
+    Col("CustomerName", "Customer.CustomerName", fallback=True),
+    Col("CustomerCode", "Customer.CustomerCode"),
+    Col("CustomerGuid", "Customer.Guid"),
+    Col("WarehouseName", "Warehouse.WarehouseName", fallback=True),
+    Col("WarehouseGuid", "Warehouse.Guid"),
+    Col("Carrier", "Carrier"),
+    Col("TrackingNumber", "TrackingNumber"),
+    Col("Guid", "Guid"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(COLUMNS)
+_extract = compile_extractor(COLUMNS)
+_converters = column_converters(COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,68 +36,20 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/SalesShipments")
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="SalesShipments",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
-    headers = [
-        "ShipmentNumber",
-        "ShipmentDate",
-        "ShipmentStatus",
-        "SalesOrderNumber",
-        "SalesOrderGuid",
-        "CustomerName",
-        "CustomerCode",
-        "CustomerGuid",
-        "WarehouseName",
-        "WarehouseGuid",
-        "Carrier",
-        "TrackingNumber",
-        "Guid",
-        "LastModifiedOn",
-    ]
-
-    rows: List[List[Any]] = []
-
-    for s in data.get("Items", []):
-        customer = s.get("Customer")
-        warehouse = s.get("Warehouse")
-        sales_order = s.get("SalesOrder")
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(map(_extract, items), _converters)
 
-        # tolerate dict or string shapes
-        cust_name = customer.get("CustomerName") if isinstance(customer, dict) else customer
-        cust_code = customer.get("CustomerCode") if isinstance(customer, dict) else None
-        cust_guid = customer.get("Guid") if isinstance(customer, dict) else None
 
-        wh_name = warehouse.get("WarehouseName") if isinstance(warehouse, dict) else warehouse
-        wh_guid = warehouse.get("Guid") if isinstance(warehouse, dict) else None
-
-        so_number = sales_order.get("OrderNumber") if isinstance(sales_order, dict) else sales_order
-        so_guid = sales_order.get("Guid") if isinstance(sales_order, dict) else None
-
-        rows.append([
-            s.get("ShipmentNumber"),
-            parse_unleashed_dotnet_date(s.get("ShipmentDate")),
-            s.get("ShipmentStatus"),
-            so_number,
-            so_guid,
-            cust_name,
-            cust_code,
-            cust_guid,
-            wh_name,
-            wh_guid,
-            s.get("Carrier"),
-            s.get("TrackingNumber"),
-            s.get("Guid"),
-            parse_unleashed_dotnet_date(s.get("LastModifiedOn")),
-        ])
-
-    return "SalesShipments", headers, rows
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/SalesShipments", endpoint="SalesShipments", run_id=run_id, company_id=company_id,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "SalesShipments", HEADERS, cached_transform("SalesShipments", items, page_hashes, transform)
@@ -1,9 +1,31 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
-
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
+
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+COLUMNS = [
+    Col("ProductCode", "Product.ProductCode", fallback=True),
+    Col("ProductDescription", "Product.ProductDescription"),
+    Col("ProductGuid", "Product.Guid"),
+    Col("WarehouseName", "Warehouse.WarehouseName", fallback=True),
+    Col("WarehouseGuid", "Warehouse.Guid"),
+    Col("QtyOnHand", "QtyOnHand"),
+    Col("QtyAllocated", "QtyAllocated"),
+    Col("QtyAvailable", "QtyAvailable"),
+    Col("QtyOnPurchase", "QtyOnPurchase"),
+    Col("QtyOnSalesOrder", "QtyOnSalesOrder"),
+    Col("AvgLandCost", "AvgLandCost"),
+    Col("TotalValue", "TotalValue"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(COLUMNS)
+_extract = compile_extractor(COLUMNS)
+_converters = column_converters(COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,61 +35,20 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/StockOnHand")
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="StockOnHand",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
-    headers = [
-        "ProductCode",
-        "ProductDescription",
-        "ProductGuid",
-        "WarehouseName",
-        "WarehouseGuid",
-        "QtyOnHand",
-        "QtyAllocated",
-        "QtyAvailable",
-        "QtyOnPurchase",
-        "QtyOnSalesOrder",
-        "AvgLandCost",
-        "TotalValue",
-        "LastModifiedOn",
-    ]
-
-    rows: List[List[Any]] = []
-
-    for item in data.get("Items", []):
-        product = item.get("Product")
-        warehouse = item.get("Warehouse")
-
-        product_code = product.get("ProductCode") if isinstance(product, dict) else product
-        product_desc = product.get("ProductDescription") if isinstance(product, dict) else None
-        product_guid = product.get("Guid") if isinstance(product, dict) else None
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(map(_extract, items), _converters)
 
-        wh_name = warehouse.get("WarehouseName") if isinstance(warehouse, dict) else warehouse
-        wh_guid = warehouse.get("Guid") if isinstance(warehouse, dict) else None
 
-        rows.append([
-            product_code,
-            product_desc,
-            product_guid,
-            wh_name,
-            wh_guid,
-            item.get("QtyOnHand"),
-            item.get("QtyAllocated"),
-            item.get("QtyAvailable"),
-            item.get("QtyOnPurchase"),
-            item.get("QtyOnSalesOrder"),
-            item.get("AvgLandCost"),
-            item.get("TotalValue"),
-            parse_unleashed_dotnet_date(item.get("LastModifiedOn")),
-        ])
-
-    return "StockOnHand", headers, rows
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/StockOnHand", endpoint="StockOnHand", run_id=run_id, company_id=company_id,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "StockOnHand", HEADERS, cached_transform("StockOnHand", items, page_hashes, transform)
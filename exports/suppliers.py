@@ -1,9 +1,28 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
-
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
+
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+COLUMNS = [
+    Col("SupplierCode", "SupplierCode"),
+    Col("SupplierName", "SupplierName"),
+    Col("Email", "Email"),
+    Col("PhoneNumber", "PhoneNumber"),
+    Col("MobileNumber", "MobileNumber"),
+    Col("Website", "Website"),
+    Col("SupplierRef", "SupplierRef"),
+    Col("Currency", "Currency.CurrencyCode", fallback=True),
+    Col("Guid", "Guid"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(COLUMNS)
+_extract = compile_extractor(COLUMNS)
+_converters = column_converters(COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,48 +32,20 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/Suppliers")
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="Suppliers",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
-    headers = [
-        "SupplierCode",
-        "SupplierName",
-        "Email",
-        "PhoneNumber",
-        "MobileNumber",
-        "Website",
-        "SupplierRef",
-        "Currency",
-        "Guid",
-        "LastModifiedOn",
-    ]
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(map(_extract, items), _converters)
 
-    rows: List[List[Any]] = []
-
-    for s in data.get("Items", []):
-        currency = s.get("Currency")
-        currency_code = currency.get("CurrencyCode") if isinstance(currency, dict) else currency
-
-        rows.append([
-            s.get("SupplierCode"),
-            s.get("SupplierName"),
-            s.get("Email"),
-            s.get("PhoneNumber"),
-            s.get("MobileNumber"),
-            s.get("Website"),
-            s.get("SupplierRef"),
-            currency_code,
-            s.get("Guid"),
-            parse_unleashed_dotnet_date(s.get("LastModifiedOn")),
-        ])
-
-    return "Suppliers", headers, rows
+
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/Suppliers", endpoint="Suppliers", run_id=run_id, company_id=company_id,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "Suppliers", HEADERS, cached_transform("Suppliers", items, page_hashes, transform)
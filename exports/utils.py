@@ -1,5 +1,54 @@
-from datetime import datetime, timezone
-from typing import Optional
+import os
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:  # optional: without it parse_unleashed_dotnet_dates parses value by value
+    numpy = None
+
+# distinct date strings remembered by parse_unleashed_dotnet_date (0 disables the cache)
+_raw_date_cache_size = os.getenv("UNLEASHED_DATE_CACHE_SIZE", "65536")
+try:
+    DATE_CACHE_SIZE = max(int(_raw_date_cache_size), 0)
+except ValueError:
+    DATE_CACHE_SIZE = 65536
+
+# /Date(1700000000000)/ or /Date(1700000000000+1300)/; the offset is informational,
+# the milliseconds are always UTC
+_DOTNET_DATE = re.compile(r"/Date\((-?[0-9]+)(?:[+-][0-9]{4})?\)/")
+
+_EPOCH = datetime(1970, 1, 1)
+# datetime64 -> datetime only works up to datetime.max; later values go the per-value way
+_MAX_MILLIS = (datetime.max - _EPOCH) // timedelta(milliseconds=1)
+
+
+def _dotnet_millis(value: str) -> Optional[int]:
+    inner = value[6:-2]
+    # isdigit() alone also accepts e.g. '²', which int() rejects
+    if value.startswith("/Date(") and value.endswith(")/") and inner.isascii() and inner.isdigit():
+        return int(inner)
+    # offset, negative or padded variants
+    m = _DOTNET_DATE.fullmatch(value.strip())
+    return int(m.group(1)) if m else None
+
+
+def _parse(value: str) -> Optional[datetime]:
+    ms = _dotnet_millis(value)
+    if ms is None:
+        return None
+    try:
+        return _EPOCH + timedelta(milliseconds=ms)
+    except OverflowError:
+        return None
+
+
+if DATE_CACHE_SIZE > 0:
+    # the same timestamps repeat across rows (e.g. every line of an order); datetimes are immutable
+    _parse = lru_cache(maxsize=DATE_CACHE_SIZE)(_parse)
+
 
 def parse_unleashed_dotnet_date(value: Optional[str]) -> Optional[datetime]:
     """
@@ -8,9 +57,32 @@ def parse_unleashed_dotnet_date(value: Optional[str]) -> Optional[datetime]:
     """
     if not value or not isinstance(value, str):
         return None
-    try:
-        ms = int(value.strip("/").replace("Date(", "").replace(")", ""))
-        dt_utc = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
-        return dt_utc.replace(tzinfo=None)  # <- IMPORTANT: remove timezone
-    except Exception:
-        return None
+    return _parse(value)
+
+
+
+def parse_unleashed_dotnet_dates(values: Sequence[Any]) -> List[Optional[datetime]]:
+    """
+    Converts a whole column at once; same results as parse_unleashed_dotnet_date per value.
+    With numpy, the plain '/Date(<ms>)/' strings are checked and converted as arrays
+    (int64 milliseconds viewed as datetime64[ms]); offset, negative and invalid strings,
+    and anything that is not a string, fall back to the per-value parser.
+    """
+    if numpy is None or len(values) < 2:
+        return [parse_unleashed_dotnet_date(v) for v in values]
+
+    strings = numpy.array([v if isinstance(v, str) else "" for v in values], dtype=str)
+    plain = numpy.char.startswith(strings, "/Date(") & numpy.char.endswith(strings, ")/")
+    inner = numpy.char.rstrip(numpy.char.replace(strings, "/Date(", "", 1), ")/")
+    # ASCII digits only (str.isdigit also takes e.g. '²'); the zero code points are padding
+    codes = inner.view(numpy.uint32).reshape(len(inner), -1)
+    digits = ((codes >= 48) & (codes <= 57)) | (codes == 0)
+    lengths = numpy.char.str_len(inner)
+    # exactly the 8 wrapper characters removed, at most 18 digits (fits int64)
+    plain &= digits.all(axis=1) & (lengths > 0) & (lengths <= 18)
+    plain &= lengths == numpy.char.str_len(strings) - 8
+
+    millis = numpy.where(plain, inner, "0").astype(numpy.int64)
+    plain &= millis <= _MAX_MILLIS
+    dates = numpy.where(plain, millis, 0).view("datetime64[ms]").tolist()
+    return [d if ok else parse_unleashed_dotnet_date(v) for d, ok, v in zip(dates, plain.tolist(), values)]
@@ -1,9 +1,151 @@
-from typing import Any, Optional
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import os
+import threading
+import time
+
+from config import Config
+from exports.utils import parse_unleashed_dotnet_date
+from sync_state import SyncState, load_sync_state, save_sync_state
+
 
 def db_enabled() -> bool:
     return bool(os.getenv("AZURE_SQL_SERVER") and os.getenv("AZURE_SQL_DB") and os.getenv("AZURE_SQL_USER") and os.getenv("AZURE_SQL_PASSWORD"))
 
+
+class RawPayloadQueue:
+    """
+    Moves raw payload persistence (json.dumps + Azure SQL write) off the export path.
+    A single daemon thread drains a queue bounded by payload count and by response
+    body bytes (so a few multi-MB pages cannot pile up) into db.insert_raw_payload.
+    Pending payloads are counted per run, so a run's drain never waits on another's.
+    Rows written, failed and their latency are counted where the batches are written
+    (db.raw_writer_stats); handed_off only means the writer has buffered the payload.
+    """
+
+    def __init__(self, max_size: int = 200, put_timeout: float = 30.0, max_bytes: int = 64 * 1024 * 1024):
+        self.put_timeout = put_timeout
+        self.max_size = max(max_size, 1)
+        self.max_bytes = max(max_bytes, 1)
+        self._queue: "deque[Tuple[float, int, Dict[str, Any]]]" = deque()
+        self._queued_bytes = 0
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending: Dict[Optional[str], int] = {}
+
+        self.enqueued = 0
+        self.handed_off = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_drain_seconds: Optional[float] = None
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="raw-payload-writer", daemon=True)
+                self._worker.start()
+
+    def _has_room(self, size: int) -> bool:
+        # caller holds self._lock; an empty queue always takes one payload, however large
+        if not self._queue:
+            return True
+        return len(self._queue) < self.max_size and self._queued_bytes + size <= self.max_bytes
+
+    def put(self, size_bytes: int = 0, **payload: Any) -> bool:
+        self._ensure_worker()
+        run_id = payload.get("run_id")
+        size = max(size_bytes, 0)
+        with self._changed:
+            if not self._changed.wait_for(lambda: self._has_room(size), timeout=self.put_timeout):
+                self.dropped += 1
+                return False
+            self._queue.append((time.monotonic(), size, payload))
+            self._queued_bytes += size
+            self._pending[run_id] = self._pending.get(run_id, 0) + 1
+            self.enqueued += 1
+            self._changed.notify_all()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: bool(self._queue))
+                enqueued_at, size, payload = self._queue.popleft()
+                self._queued_bytes -= size
+                self._changed.notify_all()
+            ok = True
+            try:
+                from db import insert_raw_payload
+                insert_raw_payload(enqueued_at=enqueued_at, **payload)
+            except Exception:
+                # the payload could not be prepared, or the batch write it triggered failed
+                # (that batch's rows are counted as failed by the writer)
+                ok = False
+            run_id = payload.get("run_id")
+            with self._changed:
+                if ok:
+                    self.handed_off += 1
+                else:
+                    self.errors += 1
+                self._pending[run_id] -= 1
+                if not self._pending[run_id]:
+                    del self._pending[run_id]
+                self._changed.notify_all()
+
+    def drain(self, timeout: Optional[float] = None, run_id: Optional[str] = None) -> bool:
+        """
+        Waits until every queued payload of run_id (default: of every run) has been handed
+        to the DB writer. False on timeout.
+        """
+        started = time.monotonic()
+        if run_id is None:
+            done = lambda: not self._pending  # noqa: E731
+        else:
+            done = lambda: run_id not in self._pending  # noqa: E731
+        with self._changed:
+            drained = self._changed.wait_for(done, timeout=timeout)
+            self.last_drain_seconds = time.monotonic() - started
+        return drained
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "depth": len(self._queue),
+                "queued_bytes": self._queued_bytes,
+                "pending_runs": len(self._pending),
+                "enqueued": self.enqueued,
+                "handed_off": self.handed_off,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "last_drain_seconds": self.last_drain_seconds,
+            }
+
+
+_raw_queue = RawPayloadQueue(
+    max_size=Config.RAW_QUEUE_MAX_SIZE,
+    put_timeout=Config.RAW_QUEUE_PUT_TIMEOUT_SECONDS,
+    max_bytes=Config.RAW_QUEUE_MAX_MB * 1024 * 1024,
+)
+
+
+def drain_raw_payloads(timeout: Optional[float] = None, run_id: Optional[str] = None) -> bool:
+    """Call on run completion, before finish_run, so the run's payloads are all written."""
+    drained = _raw_queue.drain(timeout=timeout, run_id=run_id)
+    if db_enabled():
+        try:
+            from db import flush_raw_payloads
+            flush_raw_payloads()
+        except Exception:
+            pass
+    return drained
+
+
+def raw_queue_stats() -> Dict[str, Any]:
+    return _raw_queue.stats()
+
+
 def try_insert_raw(
     *,
     run_id: Optional[str],
@@ -14,23 +156,123 @@ def try_insert_raw(
     request_url: Optional[str] = None,
     page_number: Optional[int] = None,
     api_cursor: Optional[str] = None,
+    size_bytes: int = 0,
 ) -> None:
+    """Queues the payload for the background writer; never raises. size_bytes: its response body size."""
     if not run_id:
         return
     if not db_enabled():
         return
 
-    try:
-        from db import insert_raw_payload 
-        insert_raw_payload(
+    _raw_queue.put(
+        size_bytes=size_bytes,
+        run_id=run_id,
+        company_id=company_id,
+        endpoint=endpoint,
+        http_status=http_status,
+        payload_obj=payload_obj,
+        request_url=request_url,
+        page_number=page_number,
+        api_cursor=api_cursor,
+    )
+
+
+def iter_api_items(
+    client: Any,
+    path: str,
+    *,
+    endpoint: str,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    paged: bool = True,
+    incremental: bool = False,
+    page_hashes: Optional[List[Optional[str]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streams items from every page of an endpoint (a single GET when paged=False,
+    e.g. Warehouses, which Unleashed does not paginate).
+    Each raw page is stored (side-effect) for replay/audit before its items are yielded,
+    using that page's own response metadata.
+
+    incremental=True (paged endpoints only) pulls just the rows changed since the stored
+    high-water mark and yields the merged snapshot instead; see sync_state.
+
+    page_hashes, when given, collects each page's body hash (None where unknown, and for
+    incremental pulls, whose output also depends on the stored snapshot).
+    """
+    if incremental and paged:
+        if page_hashes is not None:
+            page_hashes.append(None)
+        yield from _iter_incremental_items(
+            client, path, endpoint=endpoint, run_id=run_id, company_id=company_id, params=params
+        )
+        return
+
+    if paged:
+        responses = client.iter_responses(path, params=params)
+    else:
+        responses = iter([client.fetch(path, params=params, page_number=1)])
+
+    for resp in responses:
+        try_insert_raw(
             run_id=run_id,
             company_id=company_id,
             endpoint=endpoint,
-            http_status=http_status,
-            payload_obj=payload_obj,
-            request_url=request_url,
-            page_number=page_number,
-            api_cursor=api_cursor,
+            http_status=resp.status_code,
+            payload_obj=resp.data,
+            request_url=resp.url,
+            page_number=resp.page_number,
+            api_cursor=None,
+            size_bytes=getattr(resp, "bytes", 0) or 0,
         )
-    except Exception:
-        return
+        if page_hashes is not None:
+            page_hashes.append(getattr(resp, "content_sha256", None))
+        yield from resp.data.get("Items") or []
+
+
+def _iter_incremental_items(
+    client: Any,
+    path: str,
+    *,
+    endpoint: str,
+    run_id: Optional[str],
+    company_id: Optional[str],
+    params: Optional[Dict[str, Any]],
+) -> Iterator[Dict[str, Any]]:
+    state = load_sync_state(company_id, endpoint)
+    now = datetime.now(timezone.utc)
+    full_every = Config.SYNC_FULL_EVERY_HOURS
+    max_age = timedelta(hours=full_every) if full_every > 0 else None
+    if state.full_sync_due(now, max_age):
+        # start over so the full pull replaces the snapshot instead of merging into it
+        state = SyncState()
+
+    params = dict(params or {})
+    modified_since = state.modified_since()
+    if modified_since:
+        params["modifiedSince"] = modified_since
+
+    high_water_mark = state.high_water_mark
+    unkeyed = []
+    for item in iter_api_items(
+        client, path, endpoint=endpoint, run_id=run_id, company_id=company_id, params=params
+    ):
+        guid = item.get("Guid")
+        if guid:
+            state.items[guid] = item
+        else:
+            unkeyed.append(item)
+
+        modified = parse_unleashed_dotnet_date(item.get("LastModifiedOn"))
+        if modified and (high_water_mark is None or modified > high_water_mark):
+            high_water_mark = modified
+
+    # only reached once every page was read, so a failed pull never advances the mark
+    state.high_water_mark = high_water_mark
+    if not modified_since:
+        state.full_sync_at = now
+    save_sync_state(company_id, endpoint, state)
+
+    yield from state.items.values()
+    yield from unkeyed
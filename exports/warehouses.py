@@ -1,9 +1,30 @@
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 from unleashed_client import UnleashedClient
-from exports.utils import parse_unleashed_dotnet_date
-from exports.utils_db import try_insert_raw
-
-ExportResult = Tuple[str, List[str], List[List[Any]]]
+from exports.utils import parse_unleashed_dotnet_dates
+from exports.utils_db import iter_api_items
+from exports.mapping import Col, column_converters, compile_extractor, convert_columns, headers
+from exports.result_cache import cached_transform
+
+ExportResult = Tuple[str, List[str], Iterable[List[Any]]]
+
+COLUMNS = [
+    Col("WarehouseCode", "WarehouseCode"),
+    Col("WarehouseName", "WarehouseName"),
+    Col("IsDefault", "IsDefault"),
+    Col("IsObsolete", "IsObsolete"),
+    Col("StreetAddress", "Address.StreetAddress"),
+    Col("Suburb", "Address.Suburb"),
+    Col("City", "Address.City"),
+    Col("Region", "Address.Region"),
+    Col("Country", "Address.Country"),
+    Col("PostCode", "Address.PostCode"),
+    Col("Guid", "Guid"),
+    Col("LastModifiedOn", "LastModifiedOn", convert_column=parse_unleashed_dotnet_dates),
+]
+
+HEADERS = headers(COLUMNS)
+_extract = compile_extractor(COLUMNS)
+_converters = column_converters(COLUMNS)
 
 
 def dummy() -> ExportResult:
@@ -13,53 +34,20 @@ def dummy() -> ExportResult:
     ]
 
 
-def from_api(client: UnleashedClient, *, run_id: Optional[str] = None, company_id: Optional[str] = None) -> ExportResult:
-    data: Dict[str, Any] = client.get("/Warehouses")
-    try_insert_raw(
-        run_id=run_id,
-        company_id=company_id,
-        endpoint="Warehouses",
-        http_status=getattr(client, "last_status_code", None),
-        payload_obj=data,
-        request_url=getattr(client, "last_url", None),
-        page_number=1,
-        api_cursor=None,
-    )
-    headers = [
-        "WarehouseCode",
-        "WarehouseName",
-        "IsDefault",
-        "IsObsolete",
-        "StreetAddress",
-        "Suburb",
-        "City",
-        "Region",
-        "Country",
-        "PostCode",
-        "Guid",
-        "LastModifiedOn",
-    ]
-
-    rows: List[List[Any]] = []
-
-    for w in data.get("Items", []):
-        address = w.get("Address")
-        if not isinstance(address, dict):
-            address = {}
+def transform(items: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    return convert_columns(map(_extract, items), _converters)
 
-        rows.append([
-            w.get("WarehouseCode"),
-            w.get("WarehouseName"),
-            w.get("IsDefault"),
-            w.get("IsObsolete"),
-            address.get("StreetAddress"),
-            address.get("Suburb"),
-            address.get("City"),
-            address.get("Region"),
-            address.get("Country"),
-            address.get("PostCode"),
-            w.get("Guid"),
-            parse_unleashed_dotnet_date(w.get("LastModifiedOn")),
-        ])
 
-    return "Warehouses", headers, rows
+def from_api(
+    client: UnleashedClient,
+    *,
+    run_id: Optional[str] = None,
+    company_id: Optional[str] = None,
+    incremental: bool = False,
+) -> ExportResult:
+    page_hashes: List[Optional[str]] = []
+    items = iter_api_items(
+        client, "/Warehouses", endpoint="Warehouses", run_id=run_id, company_id=company_id, paged=False,
+        incremental=incremental, page_hashes=page_hashes,
+    )
+    return "Warehouses", HEADERS, cached_transform("Warehouses", items, page_hashes, transform)
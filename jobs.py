@@ -0,0 +1,299 @@
+"""
+Background export jobs, so a large export never runs inside an HTTP request.
+POST /jobs enqueues a job; a small worker pool builds the file into data/jobs/<id>.out
+while /jobs/<id> reports status and per-export progress (pages fetched, rows written),
+and /jobs/<id>/download serves the finished file.
+
+Job state is one JSON file per job next to its output, so any worker process can answer
+status and download requests. Jobs left queued or running by a process that no longer
+exists are marked failed when the next JobManager starts.
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs")
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# progress is written to disk at most this often while a job runs
+PROGRESS_SAVE_INTERVAL_SECONDS = 1.0
+
+# rows counted locally before the shared counter is updated
+_ROW_COUNT_BATCH = 1000
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ExportProgress:
+    """Per-export counters for one job; updated from export and page worker threads."""
+
+    def __init__(self, keys: Iterable[str], on_change: Optional[Callable[[], None]] = None):
+        self._lock = threading.Lock()
+        self._on_change = on_change
+        self.exports: Dict[str, Dict[str, Any]] = {
+            key: {"status": "queued", "pages": 0, "rows": 0} for key in keys
+        }
+
+    def _update(self, key: str, status: Optional[str] = None, pages: int = 0, rows: int = 0) -> None:
+        with self._lock:
+            entry = self.exports.setdefault(key, {"status": "queued", "pages": 0, "rows": 0})
+            if status:
+                entry["status"] = status
+            entry["pages"] += pages
+            entry["rows"] += rows
+        if self._on_change:
+            self._on_change()
+
+    def started(self, key: str) -> None:
+        self._update(key, status="running")
+
+    def page(self, key: str) -> None:
+        self._update(key, pages=1)
+
+    def failed(self, key: str) -> None:
+        self._update(key, status="failed")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: dict(entry) for key, entry in self.exports.items()}
+
+    def count_rows(self, key: str, rows: Iterable[List[Any]]) -> Iterator[List[Any]]:
+        """Passes rows through, counting them; the export is done once they are exhausted."""
+        self.started(key)
+        pending = 0
+        try:
+            for r in rows:
+                yield r
+                pending += 1
+                if pending >= _ROW_COUNT_BATCH:
+                    self._update(key, rows=pending)
+                    pending = 0
+        except BaseException:
+            self._update(key, status="failed", rows=pending)
+            raise
+        self._update(key, status="succeeded", rows=pending)
+
+    def client(self, key: str, client: Any) -> "CountingClient":
+        return CountingClient(client, lambda: self.page(key))
+
+
+class CountingClient:
+    """Wraps an UnleashedClient (or ReplayClient) and reports every page it returns."""
+
+    def __init__(self, client: Any, on_page: Callable[[], None]):
+        self._client = client
+        self._on_page = on_page
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def fetch(self, *args: Any, **kwargs: Any) -> Any:
+        resp = self._client.fetch(*args, **kwargs)
+        self._on_page()
+        return resp
+
+    def iter_responses(self, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        for resp in self._client.iter_responses(*args, **kwargs):
+            self._on_page()
+            yield resp
+
+
+# runner(job, progress, output_path) writes the finished file to output_path
+JobRunner = Callable[[Dict[str, Any], ExportProgress, str], None]
+
+
+class JobManager:
+    def __init__(
+        self,
+        runner: JobRunner,
+        workers: int = 2,
+        retention_hours: float = 24.0,
+        directory: Optional[str] = None,
+    ):
+        self.runner = runner
+        self.retention = timedelta(hours=retention_hours)
+        self.directory = directory or _DATA_DIR
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="export-job")
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._recover()
+
+    # --- storage -------------------------------------------------------------
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def output_path(self, job: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, f"{job['id']}.out")
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(job, f)
+            os.replace(tmp, self._state_path(job["id"]))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._state_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _recover(self) -> None:
+        for job in self.list_jobs():
+            if job["status"] not in ACTIVE_STATUSES:
+                continue
+            if job.get("host") == socket.gethostname() and _pid_alive(job.get("pid")):
+                continue
+            job.update(status="failed", error="Interrupted: the worker running this job stopped.", finished_at=_now())
+            self._save(job)
+
+    def _purge_expired(self) -> None:
+        cutoff = datetime.now(timezone.utc) - self.retention
+        for job in self.list_jobs():
+            if job["status"] in ACTIVE_STATUSES:
+                continue
+            try:
+                finished = datetime.fromisoformat(job.get("finished_at") or job["created_at"])
+            except (KeyError, ValueError):
+                continue
+            if finished < cutoff:
+                for path in (self.output_path(job), self._state_path(job["id"])):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    # --- public API ----------------------------------------------------------
+
+    def submit(self, keys: List[str], fmt: str, download_name: str, mimetype: str,
+               options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._purge_expired()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "keys": list(keys),
+            "format": fmt,
+            "download_name": download_name,
+            "mimetype": mimetype,
+            "options": dict(options or {}),
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "progress": {key: {"status": "queued", "pages": 0, "rows": 0} for key in keys},
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+        }
+        with self._lock:
+            self._active[job["id"]] = job
+        self._save(job)
+        self._pool.submit(self._run, job)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._active.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job))
+        return self._load(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Blocks until a job submitted by this process has finished; returns its final state."""
+        with self._finished:
+            self._finished.wait_for(lambda: job_id not in self._active, timeout=timeout)
+        return self.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Every stored job, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                job = self._load(name[:-len(".json")])
+                if job:
+                    jobs.append(job)
+        jobs.sort(key=lambda j: j.get("created_at") or "", reverse=True)
+        return jobs
+
+    def latest_by_export(self) -> Dict[str, Dict[str, Any]]:
+        """key -> the newest job that included that export."""
+        latest: Dict[str, Dict[str, Any]] = {}
+        for job in self.list_jobs():
+            for key in job.get("keys", []):
+                latest.setdefault(key, job)
+        return latest
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- worker --------------------------------------------------------------
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        last_saved = [0.0]
+
+        def on_change() -> None:
+            now = time.monotonic()
+            if now - last_saved[0] < PROGRESS_SAVE_INTERVAL_SECONDS:
+                return
+            last_saved[0] = now
+            with self._lock:
+                if job["status"] != "running":
+                    return
+                job["progress"] = progress.snapshot()
+                snapshot = dict(job)
+            self._save(snapshot)
+
+        progress = ExportProgress(job["keys"], on_change=on_change)
+        with self._lock:
+            job.update(status="running", started_at=_now())
+        self._save(job)
+
+        path = self.output_path(job)
+        tmp = path + ".tmp"
+        try:
+            self.runner(job, progress, tmp)
+            os.replace(tmp, path)
+            status, error = "succeeded", None
+        except Exception as e:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            status, error = "failed", str(e)
+
+        with self._lock:
+            job.update(status=status, error=error, finished_at=_now(), progress=progress.snapshot())
+            if status == "failed":
+                for entry in job["progress"].values():
+                    if entry["status"] in ACTIVE_STATUSES:
+                        entry["status"] = "failed"
+            self._save(job)
+            self._active.pop(job["id"], None)
+            self._finished.notify_all()
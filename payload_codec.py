@@ -0,0 +1,69 @@
+"""
+Compression codecs for raw.api_payload rows.
+Compressed rows keep payload_json NULL and store bytes in payload_compressed with a
+payload_codec tag ("gzip" or "zstd"), so readers know how to decode each row.
+
+Schema (once, before enabling RAW_PAYLOAD_COMPRESSION):
+  ALTER TABLE raw.api_payload ADD payload_compressed VARBINARY(MAX) NULL, payload_codec VARCHAR(16) NULL;
+"""
+import gzip
+import json
+from typing import Any, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+CODECS = ("gzip", "zstd")
+
+
+def resolve_codec(codec: Optional[str]) -> Optional[str]:
+    """Normalises a configured codec; zstd falls back to gzip when zstandard is not installed."""
+    codec = (codec or "").strip().lower()
+    if not codec or codec == "none":
+        return None
+    if codec not in CODECS:
+        raise ValueError(f"Unknown payload codec {codec!r} (expected one of {', '.join(CODECS)})")
+    if codec == "zstd" and zstandard is None:
+        return "gzip"
+    return codec
+
+
+def compress(payload_json: str, codec: str) -> bytes:
+    data = payload_json.encode("utf-8")
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd payload codec requires zstandard (pip install zstandard).")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Unknown payload codec {codec!r}")
+
+
+def decompress(blob: bytes, codec: str) -> str:
+    if codec == "gzip":
+        data = gzip.decompress(blob)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd payloads requires zstandard (pip install zstandard).")
+        data = zstandard.ZstdDecompressor().decompress(blob)
+    else:
+        raise ValueError(f"Unknown payload codec {codec!r}")
+    return data.decode("utf-8")
+
+
+def decode_payload(
+    payload_json: Optional[str],
+    payload_compressed: Optional[bytes] = None,
+    payload_codec: Optional[str] = None,
+) -> Optional[Any]:
+    """
+    Returns the decoded payload of a raw.api_payload row, whichever way it was stored.
+    None for reference rows (deduplicated pages), which carry only payload_hash.
+    """
+    if payload_json is not None:
+        return json.loads(payload_json)
+    if payload_compressed is not None:
+        return json.loads(decompress(bytes(payload_compressed), payload_codec or "gzip"))
+    return None
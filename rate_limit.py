@@ -0,0 +1,99 @@
+"""
+Client-side throttling for Unleashed API calls.
+One TokenBucket is shared by every caller of an UnleashedClient (page workers included).
+"""
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import threading
+import time
+
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    retries: int = 0
+    throttled: int = 0
+    retry_wait_seconds: float = 0.0
+    throttle_wait_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with an adaptive rate.
+    A 429 halves the rate (down to min_rate) and can block all callers for Retry-After;
+    each success then creeps the rate back up towards the configured maximum.
+    """
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None, min_rate: Optional[float] = None):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be > 0")
+        self.max_rate = float(rate_per_second)
+        self.rate = self.max_rate
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 10
+        self.capacity = float(burst) if burst else max(self.max_rate, 1.0)
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Blocks until a token is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def success(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After is either delta-seconds or an HTTP-date.
+    Returns seconds to wait, or None if missing/unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
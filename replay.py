@@ -0,0 +1,231 @@
+"""
+Rebuild exports from stored raw payloads instead of calling Unleashed.
+
+ReplayClient stands in for UnleashedClient, so every exports/*.from_api transform runs
+unchanged over pages read from raw.api_payload (DbPayloadSource) or from a local
+directory of JSON pages (FilePayloadSource: <root>/<Endpoint>/page_0001.json, ...).
+
+Run: python replay.py --exports sales_orders products [--run-id RUN | --dir DIR] [--dump-to DIR]
+Prints row counts and transform timings, e.g. to benchmark transforms offline.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sync_state import load_sync_state, sync_state_path
+from unleashed_client import UnleashedResponse
+
+Page = Tuple[Optional[int], Any]
+
+
+class DbPayloadSource:
+    """
+    Pages from raw.api_payload for one run_id, or (run_id=None) from the latest
+    successful full pull of each endpoint.
+
+    With use_sync_snapshot (set when INCREMENTAL_SYNC is on) and run_id=None, an endpoint
+    that has a local sync_state snapshot is served from it instead, as one page: the
+    snapshot merges every delta pulled since, so it is newer than any full run.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, company_id: Optional[str] = None,
+                 use_sync_snapshot: bool = False):
+        self.run_id = run_id
+        self.company_id = company_id
+        self.use_sync_snapshot = use_sync_snapshot
+
+    def _run_id(self, endpoint: str) -> Optional[str]:
+        from db import latest_successful_run_id
+
+        return self.run_id or latest_successful_run_id(endpoint, company_id=self.company_id)
+
+    def _snapshot_path(self, endpoint: str) -> Optional[str]:
+        if self.run_id or not self.use_sync_snapshot:
+            return None
+        path = sync_state_path(self.company_id, endpoint)
+        return path if os.path.isfile(path) else None
+
+    def pages(self, endpoint: str) -> List[Page]:
+        if self._snapshot_path(endpoint):
+            state = load_sync_state(self.company_id, endpoint)
+            if state.items:
+                return [(1, {"Items": list(state.items.values())})]
+
+        from db import read_run_payloads
+
+        run_id = self._run_id(endpoint)
+        if not run_id:
+            return []
+        return read_run_payloads(run_id, endpoint)
+
+    def fingerprint(self, endpoint: str) -> Optional[str]:
+        """Changes whenever pages() would return different data; None if nothing is stored."""
+        path = self._snapshot_path(endpoint)
+        if path:
+            st = os.stat(path)
+            return f"snapshot:{st.st_mtime_ns}:{st.st_size}"
+        return self._run_id(endpoint)
+
+
+class FilePayloadSource:
+    """Local stand-in for raw.api_payload: one JSON file per stored page."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, endpoint: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", endpoint))
+
+    def pages(self, endpoint: str) -> List[Page]:
+        folder = self._dir(endpoint)
+        if not os.path.isdir(folder):
+            return []
+        pages = []
+        for name in sorted(os.listdir(folder)):
+            m = re.fullmatch(r"page_(\d+)\.json", name)
+            if not m:
+                continue
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                pages.append((int(m.group(1)), json.load(f)))
+        return pages
+
+    def fingerprint(self, endpoint: str) -> Optional[str]:
+        folder = self._dir(endpoint)
+        if not os.path.isdir(folder):
+            return None
+        stamps = []
+        for name in sorted(os.listdir(folder)):
+            if re.fullmatch(r"page_(\d+)\.json", name):
+                st = os.stat(os.path.join(folder, name))
+                stamps.append(f"{name}:{st.st_mtime_ns}:{st.st_size}")
+        return "|".join(stamps) or None
+
+    def write_pages(self, endpoint: str, pages: List[Page]) -> None:
+        folder = self._dir(endpoint)
+        os.makedirs(folder, exist_ok=True)
+        for i, (page_number, payload) in enumerate(pages, start=1):
+            path = os.path.join(folder, f"page_{(page_number or i):04d}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+
+
+class ReplayClient:
+    """
+    Duck-types the UnleashedClient surface used by exports (fetch, iter_responses,
+    iter_pages, iter_items, get), serving stored pages. Query params such as
+    modifiedSince are ignored: a replay always returns exactly what was stored.
+    """
+
+    def __init__(self, source: Any):
+        self.source = source
+        self.base_url = "replay://"
+        self.client_type = "replay"
+        self._cache: Dict[str, List[Page]] = {}
+
+    def is_configured(self) -> bool:
+        return True
+
+    @staticmethod
+    def _endpoint(path: str) -> str:
+        return path.strip("/").split("/", 1)[0]
+
+    def _pages(self, endpoint: str) -> List[Page]:
+        if endpoint not in self._cache:
+            self._cache[endpoint] = self.source.pages(endpoint)
+        return self._cache[endpoint]
+
+    def _response(self, endpoint: str, page_number: Optional[int], payload: Any) -> UnleashedResponse:
+        return UnleashedResponse(
+            data=payload if isinstance(payload, dict) else {"Items": payload or []},
+            status_code=200,
+            url=f"{self.base_url}{endpoint}/{page_number or 1}",
+            elapsed_seconds=0.0,
+            bytes=0,
+            page_number=page_number,
+        )
+
+    def iter_responses(self, path: str, page_size: Optional[int] = None, params: Optional[Dict[str, Any]] = None,
+                       workers: Optional[int] = None) -> Iterator[UnleashedResponse]:
+        endpoint = self._endpoint(path)
+        for page_number, payload in self._pages(endpoint):
+            yield self._response(endpoint, page_number, payload)
+
+    def iter_pages(self, path: str, page_size: Optional[int] = None, params: Optional[Dict[str, Any]] = None,
+                   workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        for resp in self.iter_responses(path):
+            yield resp.data
+
+    def iter_items(self, path: str, page_size: Optional[int] = None, params: Optional[Dict[str, Any]] = None,
+                   workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        for data in self.iter_pages(path):
+            yield from data.get("Items") or []
+
+    def fetch(self, path: str, params: Optional[Dict[str, Any]] = None,
+              page_number: Optional[int] = None) -> UnleashedResponse:
+        """Non-paged GET (e.g. /Warehouses): the first stored page, or an empty one."""
+        endpoint = self._endpoint(path)
+        pages = self._pages(endpoint)
+        if not pages:
+            return self._response(endpoint, 1, {"Items": []})
+        return self._response(endpoint, pages[0][0], pages[0][1])
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self.fetch(path, params=params).data
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    # imported late: app builds its client (and db its connection string) from the environment
+    from app import EXPORTS, _fetch_export
+
+    parser = argparse.ArgumentParser(description="Replay stored Unleashed payloads through the export transforms.")
+    parser.add_argument("--exports", nargs="+", default=list(EXPORTS), help="EXPORTS keys (default: all)")
+    parser.add_argument("--run-id", help="raw.api_payload run_id (default: latest successful full run per endpoint)")
+    parser.add_argument("--company-id", default=None)
+    parser.add_argument("--dir", help="read pages from a local file store instead of Azure SQL")
+    parser.add_argument("--sync-snapshot", action="store_true",
+                        help="without --run-id, prefer the local incremental sync snapshot of each endpoint")
+    parser.add_argument("--dump-to", help="also write the replayed pages to a local file store")
+    args = parser.parse_args()
+
+    source = FilePayloadSource(args.dir) if args.dir else DbPayloadSource(
+        args.run_id, company_id=args.company_id, use_sync_snapshot=args.sync_snapshot
+    )
+    replay_client = ReplayClient(source)
+    dump = FilePayloadSource(args.dump_to) if args.dump_to else None
+
+    for key in args.exports:
+        if key not in EXPORTS:
+            print(f"{key}: unknown export")
+            continue
+        # first pass loads pages from the source, second pass times the transform alone
+        timings = []
+        try:
+            for _ in range(2):
+                started = time.perf_counter()
+                sheet_name, headers, rows = _fetch_export(key, None, api_client=replay_client)
+                row_count = sum(1 for _ in rows)
+                timings.append(time.perf_counter() - started)
+        except Exception as e:
+            print(f"{key}: FAILED - {e}")
+            continue
+        print(
+            f"{key}: {sheet_name} | {row_count} row(s) x {len(headers)} col(s) | "
+            f"load+transform {timings[0] * 1000:.1f} ms | transform {timings[1] * 1000:.1f} ms"
+        )
+
+    if dump:
+        for endpoint, pages in replay_client._cache.items():
+            dump.write_pages(endpoint, pages)
+        print(f"Wrote {len(replay_client._cache)} endpoint(s) to {args.dump_to}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Materialised dashboard reports, aggregated from the latest stored export data.
+
+refresh_reports() replays the stored pages of each endpoint a report needs through the
+export transforms (see replay.py), aggregates them and writes the result to
+data/reports/<key>.json, so the dashboard only ever reads small precomputed files.
+
+Refresh is incremental: each report remembers a fingerprint per source endpoint (the run
+that stored it, or the page files' mtimes) and is only recomputed when one changed.
+Each endpoint is loaded at most once per refresh, however many reports use it.
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from exports import credit_notes, customers, invoices, products, sales_orders, stock_on_hand, suppliers, warehouses
+from replay import ReplayClient
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reports")
+
+# rows in each "top N" table
+TOP_N = 10
+
+# endpoint -> the export module whose transform flattens it
+SOURCES = {
+    "SalesOrders": sales_orders,
+    "Invoices": invoices,
+    "CreditNotes": credit_notes,
+    "StockOnHand": stock_on_hand,
+    "Warehouses": warehouses,
+    "Products": products,
+    "Customers": customers,
+    "Suppliers": suppliers,
+}
+
+Rows = List[Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class ReportSpec:
+    endpoints: Tuple[str, ...]
+    compute: Callable[[Dict[str, Rows]], Dict[str, Any]]
+
+
+def _num(value: Any) -> float:
+    if isinstance(value, bool) or value is None:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _month(value: Any) -> Optional[str]:
+    return value.strftime("%Y-%m") if isinstance(value, datetime) else None
+
+
+def _table(title: str, headers: List[str], rows: Iterable[List[Any]]) -> Dict[str, Any]:
+    return {"title": title, "headers": headers, "rows": [list(r) for r in rows]}
+
+
+def _top(totals: Dict[Any, float], n: int = TOP_N) -> List[Tuple[Any, float]]:
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+def _counts(rows: Rows, column: str) -> List[List[Any]]:
+    counts: Dict[Any, int] = defaultdict(int)
+    for r in rows:
+        counts[r.get(column) or "—"] += 1
+    return [[k, v] for k, v in sorted(counts.items(), key=lambda kv: kv[1], reverse=True)]
+
+
+def sales_summary(data: Dict[str, Rows]) -> Dict[str, Any]:
+    # SalesOrders rows are order lines: order-level amounts are taken once per order
+    orders = {r.get("OrderGuid"): r for r in data["SalesOrders"] if r.get("OrderGuid")}
+    invoice_rows, credit_rows = data["Invoices"], data["CreditNotes"]
+
+    invoiced = sum(_num(r.get("SubTotal")) for r in invoice_rows)
+    credited = sum(_num(r.get("SubTotal")) for r in credit_rows)
+
+    by_month: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    by_customer: Dict[str, float] = defaultdict(float)
+    for r in invoice_rows:
+        by_month[_month(r.get("InvoiceDate")) or "—"][0] += _num(r.get("SubTotal"))
+        by_customer[r.get("CustomerName") or "—"] += _num(r.get("SubTotal"))
+    for r in credit_rows:
+        by_month[_month(r.get("CreditNoteDate")) or "—"][1] += _num(r.get("SubTotal"))
+        by_customer[r.get("CustomerName") or "—"] -= _num(r.get("SubTotal"))
+
+    return {
+        "metrics": [
+            ["Sales orders", len(orders)],
+            ["Order value (ex tax)", round(sum(_num(o.get("SubTotal")) for o in orders.values()), 2)],
+            ["Invoices", len(invoice_rows)],
+            ["Invoiced (ex tax)", round(invoiced, 2)],
+            ["Credited (ex tax)", round(credited, 2)],
+            ["Net sales (ex tax)", round(invoiced - credited, 2)],
+        ],
+        "tables": [
+            _table(
+                "Net sales by month",
+                ["Month", "Invoiced", "Credited", "Net"],
+                ([m, round(i, 2), round(c, 2), round(i - c, 2)] for m, (i, c) in sorted(by_month.items())),
+            ),
+            _table(
+                f"Top {TOP_N} customers by net sales",
+                ["Customer", "Net sales"],
+                ([name, round(total, 2)] for name, total in _top(by_customer)),
+            ),
+        ],
+    }
+
+
+def inventory_report(data: Dict[str, Rows]) -> Dict[str, Any]:
+    stock = data["StockOnHand"]
+    by_warehouse: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    by_product: Dict[str, float] = defaultdict(float)
+    for r in stock:
+        entry = by_warehouse[r.get("WarehouseName") or "—"]
+        entry[0] += _num(r.get("QtyOnHand"))
+        entry[1] += _num(r.get("TotalValue"))
+        by_product[r.get("ProductCode") or "—"] += _num(r.get("TotalValue"))
+
+    return {
+        "metrics": [
+            ["Stock lines", len(stock)],
+            ["Stock value", round(sum(_num(r.get("TotalValue")) for r in stock), 2)],
+            ["Lines with nothing available", sum(1 for r in stock if _num(r.get("QtyAvailable")) <= 0)],
+            ["Warehouses", len(data["Warehouses"])],
+            ["Active products", sum(1 for r in data["Products"] if not r.get("IsObsolete"))],
+        ],
+        "tables": [
+            _table(
+                "Stock by warehouse",
+                ["Warehouse", "Qty on hand", "Value"],
+                ([name, round(q, 2), round(v, 2)] for name, (q, v) in sorted(by_warehouse.items())),
+            ),
+            _table(
+                f"Top {TOP_N} products by stock value",
+                ["Product", "Value"],
+                ([code, round(v, 2)] for code, v in _top(by_product)),
+            ),
+        ],
+    }
+
+
+def customer_report(data: Dict[str, Rows]) -> Dict[str, Any]:
+    rows = data["Customers"]
+    return {
+        "metrics": [
+            ["Customers", len(rows)],
+            ["Taxable", sum(1 for r in rows if r.get("Taxable"))],
+        ],
+        "tables": [
+            _table("Customers by type", ["Customer type", "Customers"], _counts(rows, "CustomerType")),
+            _table("Customers by currency", ["Currency", "Customers"], _counts(rows, "Currency")),
+        ],
+    }
+
+
+def product_report(data: Dict[str, Rows]) -> Dict[str, Any]:
+    rows = data["Products"]
+    active = [r for r in rows if not r.get("IsObsolete")]
+    by_group: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    for r in active:
+        entry = by_group[r.get("ProductGroup") or "—"]
+        entry[0] += 1
+        entry[1] += _num(r.get("DefaultSellPrice"))
+        entry[2] += _num(r.get("DefaultSellPrice")) - _num(r.get("AverageLandCost"))
+
+    return {
+        "metrics": [
+            ["Products", len(rows)],
+            ["Active", len(active)],
+            ["Obsolete", len(rows) - len(active)],
+        ],
+        "tables": [
+            _table(
+                "Active products by group",
+                ["Product group", "Products", "Avg sell price", "Avg margin"],
+                ([g, n, round(sell / n, 2), round(margin / n, 2)] for g, (n, sell, margin) in sorted(by_group.items())),
+            ),
+        ],
+    }
+
+
+def purchasing_report(data: Dict[str, Rows]) -> Dict[str, Any]:
+    rows = data["Suppliers"]
+    return {
+        "metrics": [["Suppliers", len(rows)]],
+        "tables": [_table("Suppliers by currency", ["Currency", "Suppliers"], _counts(rows, "Currency"))],
+    }
+
+
+# keyed like app.DASHBOARD_REPORTS
+REPORTS: Dict[str, ReportSpec] = {
+    "sales_summary": ReportSpec(("SalesOrders", "Invoices", "CreditNotes"), sales_summary),
+    "inventory_report": ReportSpec(("StockOnHand", "Warehouses", "Products"), inventory_report),
+    "customer_report": ReportSpec(("Customers",), customer_report),
+    "product_report": ReportSpec(("Products",), product_report),
+    "purchasing_report": ReportSpec(("Suppliers",), purchasing_report),
+}
+
+
+def endpoint_for_module(module: Any) -> Optional[str]:
+    for endpoint, source_module in SOURCES.items():
+        if source_module is module:
+            return endpoint
+    return None
+
+
+def _path(key: str) -> str:
+    return os.path.join(_DATA_DIR, f"{key}.json")
+
+
+def load_report(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _save_report(key: str, report: Dict[str, Any]) -> None:
+    os.makedirs(_DATA_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=_DATA_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(report, f, default=str)
+        os.replace(tmp, _path(key))
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _load_rows(client: ReplayClient, endpoint: str) -> Rows:
+    _, headers, rows = SOURCES[endpoint].from_api(client)
+    return [dict(zip(headers, r)) for r in rows]
+
+
+_refresh_lock = threading.Lock()
+
+
+def refresh_reports(
+    source: Any,
+    endpoints: Optional[Iterable[str]] = None,
+    force: bool = False,
+    report_keys: Optional[Iterable[str]] = None,
+) -> List[str]:
+    """
+    Recomputes the reports whose stored source data changed and returns their keys.
+    endpoints limits the check to reports using one of them (e.g. those a run just stored),
+    report_keys to the named reports; force recomputes even when fingerprints are unchanged.
+    """
+    wanted = set(endpoints) if endpoints is not None else None
+    only = set(report_keys) if report_keys is not None else None
+    with _refresh_lock:
+        client = ReplayClient(source)
+        fingerprints: Dict[str, Optional[str]] = {}
+        loaded: Dict[str, Rows] = {}
+        refreshed = []
+
+        for key, spec in REPORTS.items():
+            if wanted is not None and not wanted.intersection(spec.endpoints):
+                continue
+            if only is not None and key not in only:
+                continue
+            for endpoint in spec.endpoints:
+                if endpoint not in fingerprints:
+                    fingerprints[endpoint] = source.fingerprint(endpoint)
+            current = {endpoint: fingerprints[endpoint] for endpoint in spec.endpoints}
+
+            previous = load_report(key)
+            if not force and previous is not None and previous.get("sources") == current:
+                continue
+
+            for endpoint in spec.endpoints:
+                if endpoint not in loaded:
+                    loaded[endpoint] = _load_rows(client, endpoint)
+            data = {endpoint: loaded[endpoint] for endpoint in spec.endpoints}
+
+            report = spec.compute(data)
+            report.update(
+                key=key,
+                computed_at=datetime.now(timezone.utc).isoformat(),
+                sources=current,
+                has_data=any(current.values()),
+            )
+            _save_report(key, report)
+            refreshed.append(key)
+        return refreshed
+
+
+def refresh_reports_async(
+    source: Any,
+    endpoints: Optional[Iterable[str]] = None,
+    force: bool = False,
+    report_keys: Optional[Iterable[str]] = None,
+) -> threading.Thread:
+    """refresh_reports on a daemon thread, so finishing a run never waits for the aggregation."""
+    endpoints = list(endpoints) if endpoints is not None else None
+    report_keys = list(report_keys) if report_keys is not None else None
+    thread = threading.Thread(
+        target=_refresh_quietly, args=(source, endpoints, force, report_keys), name="report-refresh", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+_last_error: Dict[str, Optional[str]] = {"error": None}
+
+
+def _refresh_quietly(source: Any, endpoints: Optional[List[str]], force: bool, report_keys: Optional[List[str]]) -> None:
+    try:
+        refresh_reports(source, endpoints, force=force, report_keys=report_keys)
+        _last_error["error"] = None
+    except Exception as e:
+        # the dashboard keeps showing the previous results; surfaced in /api-status
+        _last_error["error"] = str(e)
+
+
+def report_refresh_status() -> Dict[str, Any]:
+    return {"last_error": _last_error["error"], "running": _refresh_lock.locked()}
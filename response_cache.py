@@ -0,0 +1,213 @@
+"""
+On-disk cache of Unleashed GET responses, shared by every worker process on the host.
+Entries live in one SQLite file keyed by the signed request (account + path + sorted
+query string), expire after a per-endpoint TTL and are evicted least-recently-used
+once the file holds more than max_bytes of response bodies.
+
+A paged pull is cached as one unit: pages 2..N are keyed by the created_at of the page 1
+entry they were fetched after (its generation), so a pull never mixes a cached page 1
+with live later pages or the reverse. A TTL of 0 means the endpoint is never cached. Rows that change during the day
+(SalesOrders, StockOnHand, ...) should keep a short TTL; master data such as
+Warehouses and Products can be served from cache for hours.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cache", "responses.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS response (
+    cache_key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    url TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_response_last_access ON response (last_access);
+"""
+
+# the exact SUM(size) is re-read at most this often (other processes write to the same
+# file) and whenever the running total says max_bytes may have been crossed
+_TOTAL_RESYNC_SECONDS = 60.0
+# eviction trims to this share of max_bytes, so a full cache does not evict (and re-sum) on every put
+_EVICT_TO = 0.9
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_ttls(raw: str) -> Dict[str, float]:
+    """'Warehouses=43200, Products=21600' -> {"Warehouses": 43200.0, "Products": 21600.0}"""
+    ttls: Dict[str, float] = {}
+    for part in (raw or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            ttls[name.strip()] = max(float(value), 0.0)
+        except ValueError:
+            continue
+    return ttls
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        default_ttl_seconds: float = 300.0,
+        ttls: Optional[Dict[str, float]] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.path = path or _DEFAULT_PATH
+        self.default_ttl_seconds = default_ttl_seconds
+        self.ttls = dict(ttls or {})
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats: Dict[str, CacheStats] = {}
+        self.evictions = 0
+        # running total of body bytes, kept by put; None until read from the file
+        self._total: Optional[int] = None
+        self._total_synced_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        # caller holds self._lock; one connection shared by the page worker threads
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl_seconds)
+
+    @staticmethod
+    def key(account: str, path: str, query_string: str) -> str:
+        return hashlib.sha256(f"{account}\n{path}?{query_string}".encode("utf-8")).hexdigest()
+
+    def _count(self, endpoint: str, **deltas: int) -> None:
+        stats = self._stats.setdefault(endpoint, CacheStats())
+        for name, delta in deltas.items():
+            setattr(stats, name, getattr(stats, name) + delta)
+
+    def get(self, endpoint: str, cache_key: str) -> Optional[Tuple[bytes, str, float]]:
+        """(body, url, created_at) of a fresh entry, or None."""
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT body, url, created_at FROM response WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None or now - row[2] > ttl:
+                self._count(endpoint, misses=1)
+                return None
+            conn.execute("UPDATE response SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+            self._count(endpoint, hits=1)
+        return bytes(row[0]), row[1], row[2]
+
+    def put(self, endpoint: str, cache_key: str, url: str, body: bytes) -> Optional[float]:
+        """Stores the body; returns its created_at (None if it is not cached)."""
+        if self.ttl_for(endpoint) <= 0 or len(body) > self.max_bytes:
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            replaced = conn.execute("SELECT size FROM response WHERE cache_key = ?", (cache_key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO response (cache_key, endpoint, url, body, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, endpoint, url, body, len(body), now, now),
+            )
+            if self._total is not None:
+                self._total += len(body) - (replaced[0] if replaced else 0)
+            self._count(endpoint, stores=1)
+            self._evict(conn)
+        return now
+
+    def _sync_total(self, conn: sqlite3.Connection) -> int:
+        self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response").fetchone()[0]
+        self._total_synced_at = time.monotonic()
+        return self._total
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # caller holds self._lock; the full-table SUM only runs when the bound may be crossed
+        stale = time.monotonic() - self._total_synced_at > _TOTAL_RESYNC_SECONDS
+        if self._total is not None and not stale and self._total <= self.max_bytes:
+            return
+        total = self._sync_total(conn)
+        if total <= self.max_bytes:
+            return
+        # drop expired entries first, then least recently used until under the low-water mark
+        now = time.time()
+        expired = 0
+        for endpoint, in conn.execute("SELECT DISTINCT endpoint FROM response").fetchall():
+            cur = conn.execute(
+                "DELETE FROM response WHERE endpoint = ? AND created_at < ?",
+                (endpoint, now - self.ttl_for(endpoint)),
+            )
+            expired += cur.rowcount
+        self.evictions += expired
+        if expired:
+            total = self._sync_total(conn)
+        target = int(self.max_bytes * _EVICT_TO)
+        if total <= target:
+            return
+        victims = []
+        for cache_key, size in conn.execute("SELECT cache_key, size FROM response ORDER BY last_access").fetchall():
+            if total <= target:
+                break
+            victims.append((cache_key,))
+            total -= size
+        conn.executemany("DELETE FROM response WHERE cache_key = ?", victims)
+        self.evictions += len(victims)
+        self._total = total
+
+    def clear(self, endpoint: Optional[str] = None) -> int:
+        with self._lock:
+            conn = self._connect()
+            if endpoint:
+                cur = conn.execute("DELETE FROM response WHERE endpoint = ?", (endpoint,))
+            else:
+                cur = conn.execute("DELETE FROM response")
+            self._total = None
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response").fetchone()
+            return {
+                "path": self.path,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "endpoints": {endpoint: s.as_dict() for endpoint, s in self._stats.items()},
+            }
@@ -0,0 +1,253 @@
+"""
+In-process executor for the report schedules stored by schedules.py.
+
+Each poll computes every schedule's next run, starts the ones that are due on a bounded
+pool and records outcome and duration back on the schedule. Runs happen off-peak
+(run_hour_utc; weekly on `weekday`, monthly on the 1st), each schedule shifted by its own
+stable offset of up to jitter_minutes so they don't all hit Unleashed at the same instant.
+
+A schedule never overlaps itself. With several worker processes, only the one holding
+data/scheduler.lock runs schedules; another takes over if that process exits.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Set
+
+from schedules import list_schedules, update_schedule
+
+try:
+    import fcntl
+except ImportError:  # Windows: no leader election, so run a single worker process there
+    fcntl = None
+
+_LOCK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "scheduler.lock")
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+# run(schedule) performs one scheduled run and returns its final job state
+# ({"id", "status", "error"}); raising marks the run failed
+ScheduleRunner = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def _parse(iso_str: Optional[str]) -> Optional[datetime]:
+    if not iso_str:
+        return None
+    try:
+        return datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def jitter_offset(schedule_id: str, jitter_minutes: float) -> timedelta:
+    """Stable per-schedule delay in [0, jitter_minutes)."""
+    window_seconds = int(jitter_minutes * 60)
+    if window_seconds <= 0:
+        return timedelta(0)
+    h = int(hashlib.sha256(schedule_id.encode("utf-8")).hexdigest()[:8], 16)
+    return timedelta(seconds=h % window_seconds)
+
+
+def next_run_after(
+    frequency: str,
+    after: datetime,
+    run_hour_utc: int = 2,
+    weekday: int = 0,
+    offset: timedelta = timedelta(0),
+) -> Optional[datetime]:
+    """First off-peak slot for the frequency strictly after `after` (UTC); None if unknown."""
+    day = after.astimezone(timezone.utc).replace(hour=run_hour_utc, minute=0, second=0, microsecond=0)
+
+    if frequency == "daily":
+        candidate = day + offset
+        if candidate <= after:
+            candidate += timedelta(days=1)
+        return candidate
+
+    if frequency == "weekly":
+        candidate = day + timedelta(days=(weekday - day.weekday()) % 7) + offset
+        if candidate <= after:
+            candidate += timedelta(days=7)
+        return candidate
+
+    if frequency == "monthly":
+        candidate = day.replace(day=1) + offset
+        if candidate <= after:
+            month_start = day.replace(day=1)
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+            candidate = next_month + offset
+        return candidate
+
+    return None
+
+
+class Scheduler:
+    def __init__(
+        self,
+        run: ScheduleRunner,
+        max_concurrent: int = 1,
+        poll_seconds: float = 60.0,
+        run_hour_utc: int = 2,
+        weekday: int = 0,
+        jitter_minutes: float = 30.0,
+        lock_path: Optional[str] = None,
+    ):
+        self.run = run
+        self.max_concurrent = max(max_concurrent, 1)
+        self.poll_seconds = poll_seconds
+        self.run_hour_utc = run_hour_utc
+        self.weekday = weekday
+        self.jitter_minutes = jitter_minutes
+        self.lock_path = lock_path or _LOCK_FILE
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="schedule")
+        self._running: Set[str] = set()
+        self._unrecorded: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_file: Any = None
+        self.last_tick_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self._is_leader():
+                    self.tick()
+                    self.last_tick_error = None
+            except Exception as e:
+                # e.g. an unwritable lock file or unreadable schedules file; try again next poll
+                self.last_tick_error = str(e)
+            self._stop.wait(self.poll_seconds)
+
+    def _is_leader(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+            f = open(self.lock_path, "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+            self._lock_file = f
+        else:
+            self._lock_file = True
+        # any run still marked in progress belonged to a previous leader, which is gone
+        self._release_stale_runs()
+        return True
+
+    def _release_stale_runs(self) -> None:
+        for s in list_schedules():
+            if s.get("running_since_utc"):
+                self._release_stale_run(s)
+
+    @staticmethod
+    def _release_stale_run(
+        schedule: Dict[str, Any], error: str = "Interrupted: the process running this schedule stopped."
+    ) -> None:
+        update_schedule(schedule["id"], running_since_utc=None, last_status="failed", last_error=error)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            running = sorted(self._running)
+        return {
+            "leader": self._lock_file is not None,
+            "running": running,
+            "max_concurrent": self.max_concurrent,
+            "last_tick_error": self.last_tick_error,
+        }
+
+    def next_run(self, schedule: Dict[str, Any], after: datetime) -> Optional[datetime]:
+        return next_run_after(
+            schedule["frequency"],
+            after,
+            run_hour_utc=self.run_hour_utc,
+            weekday=self.weekday,
+            offset=jitter_offset(schedule["id"], self.jitter_minutes),
+        )
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """One pass over the schedules; returns how many runs were started."""
+        now = now or datetime.now(timezone.utc)
+        due = []
+        for s in list_schedules():
+            with self._lock:
+                running = s["id"] in self._running
+                unrecorded = s["id"] in self._unrecorded
+            if running:
+                continue
+            if unrecorded:
+                # a finished run whose outcome could not be written: free the schedule now
+                self._release_stale_run(s, "The outcome of the last run could not be recorded.")
+                with self._lock:
+                    self._unrecorded.discard(s["id"])
+                continue
+            if s.get("running_since_utc"):
+                continue
+            next_run = _parse(s.get("next_run_at_utc"))
+            if next_run is None:
+                # first sight of this schedule: plan its first slot, don't run it now
+                planned = self.next_run(s, now)
+                if planned is not None:
+                    update_schedule(s["id"], next_run_at_utc=planned.isoformat())
+                continue
+            if next_run <= now:
+                due.append((next_run, s))
+
+        started = 0
+        for _, s in sorted(due, key=lambda d: d[0]):
+            with self._lock:
+                if len(self._running) >= self.max_concurrent:
+                    break  # still due next poll
+                self._running.add(s["id"])
+            update_schedule(s["id"], running_since_utc=now.isoformat())
+            self._pool.submit(self._execute, s)
+            started += 1
+        return started
+
+    def _execute(self, schedule: Dict[str, Any]) -> None:
+        started_at = datetime.now(timezone.utc)
+        started = time.monotonic()
+        job_id, status, error = None, "succeeded", None
+        try:
+            job = self.run(schedule) or {}
+            job_id, status, error = job.get("id"), job.get("status", "succeeded"), job.get("error")
+        except Exception as e:
+            status, error = "failed", str(e)
+        finally:
+            try:
+                finished_at = datetime.now(timezone.utc)
+                # plan from the finish time, so a missed or slow run never triggers a burst of catch-ups
+                planned = self.next_run(schedule, finished_at)
+                update_schedule(
+                    schedule["id"],
+                    running_since_utc=None,
+                    last_run_at_utc=started_at.isoformat(),
+                    last_status=status,
+                    last_duration_seconds=round(time.monotonic() - started, 3),
+                    last_error=error,
+                    last_job_id=job_id,
+                    next_run_at_utc=planned.isoformat() if planned else None,
+                )
+            except Exception as e:
+                # the schedule still shows running_since_utc; the next tick releases it
+                self.last_tick_error = f"Could not record the run of schedule {schedule['id']}: {e}"
+                with self._lock:
+                    self._unrecorded.add(schedule["id"])
+            finally:
+                with self._lock:
+                    self._running.discard(schedule["id"])
@@ -1,45 +1,148 @@
 """
 File-based storage for report schedules (no database permissions required).
 Schedules are stored in data/schedules.json.
+
+Every change is a read-modify-write under an exclusive lock on data/schedules.json.lock
+and is written to a temp file then renamed over the original, so concurrent worker
+processes never lose each other's writes and readers (which take no file lock) never see
+a half-written file. Parsed schedules are kept in memory, with an id index and the
+formatted list, until the file changes.
 """
 import json
 import os
+import tempfile
+import threading
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
 
 _DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 _FILE = os.path.join(_DATA_DIR, "schedules.json")
 
+_thread_lock = threading.RLock()
+# stamp (path, inode, mtime_ns, size) of the parsed file, its schedules, their id index
+# and the list_schedules rows (built on first use)
+_cache: Dict[str, Any] = {"stamp": None, "schedules": [], "by_id": {}, "listed": None}
+
+
+@contextmanager
+def _write_lock() -> Iterator[None]:
+    with _thread_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(_DATA_DIR, exist_ok=True)
+        with open(_FILE + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _stamp() -> Optional[Tuple[str, int, int, int]]:
+    try:
+        st = os.stat(_FILE)
+    except OSError:
+        return None
+    # every save renames a new file into place, so the inode changes too
+    return (_FILE, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _remember(stamp: Optional[Tuple[str, int, int, int]], schedules: List[Dict[str, Any]]) -> None:
+    _cache["stamp"] = stamp
+    _cache["schedules"] = schedules
+    _cache["by_id"] = {s.get("id"): s for s in schedules}
+    _cache["listed"] = None
+
 
 def _load() -> List[Dict[str, Any]]:
-    if not os.path.isfile(_FILE):
+    """
+    Parsed schedules (shared: callers must not mutate them); re-read only when the file
+    changed. Callers hold _thread_lock.
+    """
+    stamp = _stamp()
+    if stamp is not None and stamp == _cache["stamp"]:
+        return _cache["schedules"]
+    if stamp is None:
+        _remember(None, [])
         return []
     try:
         with open(_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+            schedules = json.load(f)
     except (json.JSONDecodeError, OSError):
-        return []
+        schedules = []
+    if not isinstance(schedules, list):
+        schedules = []
+    _remember(stamp, schedules)
+    return schedules
 
 
 def _save(schedules: List[Dict[str, Any]]) -> None:
     os.makedirs(_DATA_DIR, exist_ok=True)
-    with open(_FILE, "w", encoding="utf-8") as f:
-        json.dump(schedules, f, indent=2)
+    fd, tmp = tempfile.mkstemp(dir=_DATA_DIR, prefix="schedules.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(schedules, f, indent=2)
+        os.replace(tmp, _FILE)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _remember(_stamp(), schedules)
+
+
+def _mutate(change: Callable[[List[Dict[str, Any]]], bool]) -> bool:
+    """
+    Applies change() to a private copy of the schedules under the write lock, saving it
+    if change() returns True. Returns what change() returned.
+    """
+    with _write_lock():
+        schedules = [dict(s) for s in _load()]
+        changed = change(schedules)
+        if changed:
+            _save(schedules)
+        return changed
+
+
+# run state recorded by the scheduler (see scheduler.py)
+RUN_FIELDS = (
+    "next_run_at_utc",
+    "running_since_utc",
+    "last_run_at_utc",
+    "last_status",
+    "last_duration_seconds",
+    "last_error",
+    "last_job_id",
+)
 
 
 def list_schedules() -> List[Dict[str, Any]]:
-    raw = _load()
-    return [
-        {
-            "id": s["id"],
-            "report_key": s["report_key"],
-            "frequency": s["frequency"],
-            "created_at_utc": s.get("created_at_utc"),
-            "created_at_display": _format_display(s.get("created_at_utc")),
-        }
-        for s in raw
-    ]
+    with _thread_lock:
+        raw = _load()
+        if _cache["listed"] is None:
+            _cache["listed"] = [_listed(s) for s in raw]
+        # callers may annotate their copies (e.g. report_label)
+        return [dict(s) for s in _cache["listed"]]
+
+
+def _listed(s: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": s["id"],
+        "report_key": s["report_key"],
+        "frequency": s["frequency"],
+        "created_at_utc": s.get("created_at_utc"),
+        "created_at_display": _format_display(s.get("created_at_utc")),
+        **{name: s.get(name) for name in RUN_FIELDS},
+        "next_run_display": _format_display(s.get("next_run_at_utc")),
+        "last_run_display": _format_display(s.get("last_run_at_utc")),
+    }
 
 
 def _format_display(iso_str: Optional[str]) -> str:
@@ -55,20 +158,52 @@ def _format_display(iso_str: Optional[str]) -> str:
 def add_schedule(report_key: str, frequency: str) -> str:
     schedule_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
-    schedules = _load()
-    schedules.insert(
-        0,
-        {
-            "id": schedule_id,
-            "report_key": report_key,
-            "frequency": frequency,
-            "created_at_utc": now,
-        },
-    )
-    _save(schedules)
+
+    def change(schedules: List[Dict[str, Any]]) -> bool:
+        schedules.insert(
+            0,
+            {
+                "id": schedule_id,
+                "report_key": report_key,
+                "frequency": frequency,
+                "created_at_utc": now,
+            },
+        )
+        return True
+
+    _mutate(change)
     return schedule_id
 
 
+def get_schedule(schedule_id: str) -> Optional[Dict[str, Any]]:
+    with _thread_lock:
+        _load()
+        s = _cache["by_id"].get(schedule_id)
+        return dict(s) if s is not None else None
+
+
 def delete_schedule(schedule_id: str) -> None:
-    schedules = [s for s in _load() if s.get("id") != schedule_id]
-    _save(schedules)
+    def change(schedules: List[Dict[str, Any]]) -> bool:
+        remaining = [s for s in schedules if s.get("id") != schedule_id]
+        if len(remaining) == len(schedules):
+            return False
+        schedules[:] = remaining
+        return True
+
+    _mutate(change)
+
+
+def update_schedule(schedule_id: str, **fields: Any) -> bool:
+    """Sets run-state fields on one schedule; False if it no longer exists."""
+    unknown = set(fields) - set(RUN_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown schedule field(s): {', '.join(sorted(unknown))}")
+
+    def change(schedules: List[Dict[str, Any]]) -> bool:
+        for s in schedules:
+            if s.get("id") == schedule_id:
+                s.update(fields)
+                return True
+        return False
+
+    return _mutate(change)
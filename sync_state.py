@@ -0,0 +1,102 @@
+"""
+File-based state for incremental (modifiedSince) sync, one file per (company_id, endpoint).
+Each file holds the high-water mark (max LastModifiedOn seen) and the merged item snapshot,
+keyed by Guid, so a delta pull can be merged back into a full dataset.
+Stored in data/sync/<company_id>/<endpoint>.json.
+
+Deltas cannot reveal deletions, so the snapshot is rebuilt from a full pull whenever
+full_sync_at is older than the caller's limit (Config.SYNC_FULL_EVERY_HOURS),
+and reset_sync_state (the full=1 form field of the run routes) forces one at the next run.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sync")
+
+# Unleashed accepts modifiedSince as an ISO timestamp without offset (UTC)
+MODIFIED_SINCE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+@dataclass
+class SyncState:
+    high_water_mark: Optional[datetime] = None
+    items: Dict[str, Any] = field(default_factory=dict)
+    # when the snapshot was last rebuilt from a full (no modifiedSince) pull
+    full_sync_at: Optional[datetime] = None
+
+    def modified_since(self) -> Optional[str]:
+        if self.high_water_mark is None:
+            return None
+        return self.high_water_mark.strftime(MODIFIED_SINCE_FORMAT)
+
+    def full_sync_due(self, now: datetime, max_age: Optional[timedelta]) -> bool:
+        """True when deletions may have piled up: no full pull yet, or none within max_age (None: never due)."""
+        if max_age is None or self.high_water_mark is None:
+            return False
+        return self.full_sync_at is None or now - self.full_sync_at >= max_age
+
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name or "default")
+
+
+def _path(company_id: Optional[str], endpoint: str) -> str:
+    return os.path.join(_DATA_DIR, _safe(company_id or "default"), _safe(endpoint) + ".json")
+
+
+def sync_state_path(company_id: Optional[str], endpoint: str) -> str:
+    return _path(company_id, endpoint)
+
+
+def load_sync_state(company_id: Optional[str], endpoint: str) -> SyncState:
+    path = _path(company_id, endpoint)
+    if not os.path.isfile(path):
+        return SyncState()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        hwm = raw.get("high_water_mark")
+        full_sync_at = raw.get("full_sync_at")
+        return SyncState(
+            high_water_mark=datetime.fromisoformat(hwm) if hwm else None,
+            items=raw.get("items") or {},
+            full_sync_at=datetime.fromisoformat(full_sync_at) if full_sync_at else None,
+        )
+    except (json.JSONDecodeError, OSError, ValueError, AttributeError):
+        # unreadable state means a full pull, never a partial merge
+        return SyncState()
+
+
+def save_sync_state(company_id: Optional[str], endpoint: str, state: SyncState) -> None:
+    path = _path(company_id, endpoint)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = {
+        "high_water_mark": state.high_water_mark.isoformat() if state.high_water_mark else None,
+        "items": state.items,
+        "full_sync_at": state.full_sync_at.isoformat() if state.full_sync_at else None,
+    }
+    # write-then-rename so a crash never leaves a truncated snapshot behind
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def reset_sync_state(company_id: Optional[str], endpoint: Optional[str] = None) -> None:
+    if endpoint:
+        path = _path(company_id, endpoint)
+        if os.path.isfile(path):
+            os.remove(path)
+        return
+    shutil.rmtree(os.path.join(_DATA_DIR, _safe(company_id or "default")), ignore_errors=True)
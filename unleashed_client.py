@@ -1,11 +1,42 @@
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, Optional
 import base64
 import hashlib
 import hmac
+import json
+import random
+import threading
+import time
 from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import EndpointStats, TokenBucket, parse_retry_after
+from response_cache import ResponseCache
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class UnleashedResponse:
+    """
+    One decoded response plus its own request metadata, so concurrent fetches
+    never share status/url state on the client.
+    """
+    data: Dict[str, Any]
+    status_code: int
+    url: str
+    elapsed_seconds: float
+    bytes: int
+    page_number: Optional[int] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    # SHA-256 of the response body; identifies unchanged source data (see exports.result_cache)
+    content_sha256: Optional[str] = None
+    # response cache generation of a paged pull (see iter_responses); None when not cached
+    cache_generation: Optional[str] = None
 
 
 @dataclass
@@ -15,9 +46,59 @@ class UnleashedClient:
     api_key: str
     client_type: str
     timeout_seconds: int = 30
-    
-    last_status_code: Optional[int] = None
-    last_url: Optional[str] = None
+    page_size: int = 200
+    page_workers: int = 1
+    # threads that may call the client at once (e.g. parallel exports); each runs up to page_workers requests
+    concurrent_callers: int = 1
+    max_pages_in_flight: Optional[int] = None
+    pool_size: int = 10
+    max_retries: int = 5
+    backoff_base_seconds: float = 1.0
+    backoff_max_seconds: float = 60.0
+    rate_limiter: Optional[TokenBucket] = None
+    response_cache: Optional[ResponseCache] = None
+
+    _session: Optional[requests.Session] = field(default=None, init=False, repr=False)
+    _session_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _stats: Dict[str, EndpointStats] = field(default_factory=dict, init=False, repr=False)
+    _stats_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __enter__(self) -> "UnleashedClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Long-lived keep-alive session shared by all calls (and page worker threads),
+        so sockets and TLS sessions are reused instead of reconnecting per request.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    # pool must cover every request in flight (callers x page workers),
+                    # or connections beyond it are discarded after use instead of kept alive
+                    pool_size = max(self.pool_size, max(self.concurrent_callers, 1) * self.page_workers)
+                    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                    session = requests.Session()
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update({
+                        "Accept-Encoding": "gzip, deflate",
+                        "Connection": "keep-alive",
+                    })
+                    self._session = session
+        return self._session
+
+    def close(self) -> None:
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        if self.response_cache is not None:
+            self.response_cache.close()
 
     def is_configured(self) -> bool:
         return bool(self.base_url and self.api_id and self.api_key and self.client_type)
@@ -40,6 +121,19 @@ class UnleashedClient:
         }
 
     def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self.fetch(path, params=params).data
+
+    def fetch(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_number: Optional[int] = None,
+        generation: Optional[str] = None,
+    ) -> UnleashedResponse:
+        """
+        generation: for pages 2..N of a paged pull, page 1's cache_generation; the page is
+        then only cached together with that page 1 (without one it bypasses the cache).
+        """
         if not self.is_configured():
             raise RuntimeError("UnleashedClient not configured (missing base_url/api_id/api_key/client_type).")
 
@@ -52,10 +146,193 @@ class UnleashedClient:
         if query_string:
             url = f"{url}?{query_string}"
 
-        resp = requests.get(url, headers=self._headers(query_string), timeout=self.timeout_seconds)
-        
-        self.last_status_code = resp.status_code
-        self.last_url = resp.url
-        
+        started = time.monotonic()
+        endpoint = self._endpoint_key(path)
+        cache_key = None
+        paged_later = page_number is not None and page_number > 1
+        if self.response_cache is not None and (generation is not None or not paged_later):
+            # keyed like the signature: same account, path and sorted query -> same response
+            cache_query = f"{query_string}#{generation}" if generation is not None else query_string
+            cache_key = ResponseCache.key(f"{self.base_url}|{self.api_id}", path, cache_query)
+            cached = self.response_cache.get(endpoint, cache_key)
+            if cached is not None:
+                body, cached_url, created_at = cached
+                return UnleashedResponse(
+                    data=json.loads(body),
+                    status_code=200,
+                    url=cached_url,
+                    elapsed_seconds=time.monotonic() - started,
+                    bytes=len(body),
+                    page_number=page_number,
+                    headers={"X-Cache": "HIT", "Age": str(int(time.time() - created_at))},
+                    content_sha256=hashlib.sha256(body).hexdigest(),
+                    cache_generation=generation if generation is not None else repr(created_at),
+                )
+
+        resp = self._send_with_retry(path, url, query_string)
         resp.raise_for_status()
-        return resp.json()
\ No newline at end of file
+
+        stored_at = None
+        if cache_key is not None and resp.status_code == 200:
+            stored_at = self.response_cache.put(endpoint, cache_key, resp.url, resp.content)
+        if generation is None and stored_at is not None:
+            generation = repr(stored_at)
+
+        return UnleashedResponse(
+            data=resp.json(),
+            status_code=resp.status_code,
+            url=resp.url,
+            # includes retries and rate-limit waits, not just the final attempt
+            elapsed_seconds=time.monotonic() - started,
+            bytes=len(resp.content),
+            page_number=page_number,
+            headers=dict(resp.headers),
+            content_sha256=hashlib.sha256(resp.content).hexdigest(),
+            cache_generation=generation,
+        )
+
+    def _send_with_retry(self, path: str, url: str, query_string: str) -> requests.Response:
+        """
+        Sends the GET through the shared rate limiter, retrying 429/5xx and connection errors
+        with exponential backoff + full jitter. Retry-After from the server wins when present,
+        up to backoff_max_seconds.
+        The final response (success or not) is returned for the caller to raise on.
+        """
+        endpoint = self._endpoint_key(path)
+        attempt = 0
+        while True:
+            waited = self.rate_limiter.acquire() if self.rate_limiter else 0.0
+            self._record(endpoint, requests=1, throttle_wait_seconds=waited)
+
+            try:
+                resp = self.session.get(url, headers=self._headers(query_string), timeout=self.timeout_seconds)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUS_CODES:
+                    if self.rate_limiter:
+                        self.rate_limiter.success()
+                    return resp
+
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                if retry_after is not None:
+                    # capped: one bad header must not stall this worker (or, through the
+                    # shared limiter, every worker) for hours
+                    retry_after = min(retry_after, self.backoff_max_seconds)
+                if resp.status_code == 429:
+                    self._record(endpoint, throttled=1)
+                    if self.rate_limiter:
+                        self.rate_limiter.throttle(retry_after)
+
+                if attempt >= self.max_retries:
+                    return resp
+                delay = retry_after if retry_after is not None else self._backoff_delay(attempt)
+                resp.close()
+
+            self._record(endpoint, retries=1, retry_wait_seconds=delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _backoff_delay(self, attempt: int) -> float:
+        cap = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def _endpoint_key(path: str) -> str:
+        # "/SalesOrders/3" -> "SalesOrders"
+        return path.strip("/").split("/", 1)[0]
+
+    def _record(self, endpoint: str, **deltas: float) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, EndpointStats())
+            for name, delta in deltas.items():
+                setattr(stats, name, getattr(stats, name) + delta)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint request/retry/throttle counters since the client was created."""
+        with self._stats_lock:
+            return {endpoint: s.as_dict() for endpoint, s in self._stats.items()}
+
+    def iter_pages(
+        self,
+        path: str,
+        page_size: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None,
+        workers: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yields one decoded page at a time; see iter_responses."""
+        for resp in self.iter_responses(path, page_size=page_size, params=params, workers=workers):
+            yield resp.data
+
+    def iter_responses(
+        self,
+        path: str,
+        page_size: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None,
+        workers: Optional[int] = None,
+    ) -> Iterator[UnleashedResponse]:
+        """
+        Yields one response at a time from a paged Unleashed resource.
+        Follows the /{Resource}/{page} scheme until Pagination.NumberOfPages is reached.
+
+        Page 1 is fetched first to learn NumberOfPages; with more than one worker,
+        pages 2..N are then prefetched concurrently but still yielded in page order,
+        with at most max_pages_in_flight pages (default 2 x workers) held at once.
+        With a response cache, pages 2..N are cached under page 1's generation: a live
+        page 1 means live pages 2..N, a cached page 1 the pages cached with it.
+        """
+        params = dict(params or {})
+        params["pageSize"] = page_size or self.page_size
+        workers = workers or self.page_workers
+
+        base_path = "/" + path.strip("/")
+
+        first = self.fetch(f"{base_path}/1", params=params, page_number=1)
+        generation = first.cache_generation
+        yield first
+
+        pagination = first.data.get("Pagination") or {}
+        number_of_pages = pagination.get("NumberOfPages") or 1
+        if number_of_pages <= 1:
+            return
+
+        if workers <= 1:
+            for page in range(2, number_of_pages + 1):
+                yield self.fetch(f"{base_path}/{page}", params=params, page_number=page, generation=generation)
+            return
+
+        yield from self._prefetch_pages(base_path, params, number_of_pages, workers, generation)
+
+    def _prefetch_pages(
+        self,
+        base_path: str,
+        params: Dict[str, Any],
+        number_of_pages: int,
+        workers: int,
+        generation: Optional[str] = None,
+    ) -> Iterator[UnleashedResponse]:
+        max_in_flight = max(self.max_pages_in_flight or workers * 2, 1)
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="unleashed-page")
+        pending: Deque[Future] = deque()
+        next_page = 2
+        try:
+            while next_page <= number_of_pages or pending:
+                while next_page <= number_of_pages and len(pending) < max_in_flight:
+                    pending.append(pool.submit(self.fetch, f"{base_path}/{next_page}", params, next_page, generation))
+                    next_page += 1
+                yield pending.popleft().result()
+        finally:
+            # consumer stopped early or a page failed: don't fetch the rest
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def iter_items(
+        self,
+        path: str,
+        page_size: Optional[int] = None,
+        params: Optional[Dict[str, Any]] = None,
+        workers: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        for data in self.iter_pages(path, page_size=page_size, params=params, workers=workers):
+            yield from data.get("Items") or []
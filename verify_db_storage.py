@@ -6,6 +6,7 @@ Checks:
   - Connection to Azure SQL
   - dbo.etl_run: run metadata (start/finish, status)
   - raw.api_payload: raw JSON from every export (Products, SalesOrders, Invoices, etc.)
+  - compressed (payload_compressed + payload_codec) and dedup reference rows, if present
 """
 import os
 import sys
@@ -24,6 +25,7 @@ def main():
 
     try:
         from db import get_conn
+        from payload_codec import decode_payload
     except Exception as e:
         print("Failed to import db:", e)
         sys.exit(1)
@@ -86,6 +88,59 @@ def main():
                     run_short = (r[1] or "")[:8] + "..." if r[1] else "NULL"
                     print(f"    id={r[0]} | run={run_short} | endpoint={r[2]} | status={r[3]} | at={r[4]}")
 
+                # 3) storage mode: plain JSON, compressed, or dedup reference (hash only)
+                cur.execute("SELECT COL_LENGTH('raw.api_payload', 'payload_compressed')")
+                has_compressed = cur.fetchone()[0] is not None
+                if has_compressed:
+                    cur.execute("""
+                        SELECT
+                          CASE
+                            WHEN payload_json IS NOT NULL THEN 'json'
+                            WHEN payload_compressed IS NOT NULL THEN 'compressed:' + ISNULL(payload_codec, '?')
+                            ELSE 'reference'
+                          END AS storage,
+                          COUNT(*),
+                          SUM(CAST(ISNULL(DATALENGTH(payload_json), 0) + ISNULL(DATALENGTH(payload_compressed), 0) AS BIGINT))
+                        FROM raw.api_payload
+                        GROUP BY
+                          CASE
+                            WHEN payload_json IS NOT NULL THEN 'json'
+                            WHEN payload_compressed IS NOT NULL THEN 'compressed:' + ISNULL(payload_codec, '?')
+                            ELSE 'reference'
+                          END
+                    """)
+                else:
+                    cur.execute("""
+                        SELECT
+                          CASE WHEN payload_json IS NOT NULL THEN 'json' ELSE 'reference' END AS storage,
+                          COUNT(*),
+                          SUM(CAST(ISNULL(DATALENGTH(payload_json), 0) AS BIGINT))
+                        FROM raw.api_payload
+                        GROUP BY CASE WHEN payload_json IS NOT NULL THEN 'json' ELSE 'reference' END
+                    """)
+                rows = cur.fetchall()
+                print("  Storage mode:")
+                for r in rows:
+                    print(f"    {r[0]}: {r[1]} row(s), {r[2] or 0} bytes")
+
+                if has_compressed:
+                    cur.execute("""
+                        SELECT TOP 1 payload_id, endpoint, payload_compressed, payload_codec
+                        FROM raw.api_payload
+                        WHERE payload_compressed IS NOT NULL
+                        ORDER BY payload_id DESC
+                    """)
+                    r = cur.fetchone()
+                    if r:
+                        try:
+                            payload = decode_payload(None, r[2], r[3])
+                            items = payload.get("Items") if isinstance(payload, dict) else None
+                            count = len(items) if isinstance(items, list) else "n/a"
+                            print(f"  Latest compressed payload: id={r[0]} | endpoint={r[1]} | codec={r[3]} | "
+                                  f"{len(r[2])} bytes -> {count} item(s)")
+                        except Exception as e:
+                            print(f"  Latest compressed payload: id={r[0]} | could not decode ({e})")
+
             print("\n--- How to view the data ---")
             print("  In SSMS / Azure Data Studio, run:")
             print("  -- List all stored payloads (metadata):")
@@ -94,6 +149,9 @@ def main():
             print("  SELECT payload_json FROM raw.api_payload WHERE endpoint = 'SalesOrders' ORDER BY payload_id DESC;")
             print("  -- Parse JSON into rows (Azure SQL / SQL Server 2016+):")
             print("  SELECT p.payload_id, p.endpoint, j.* FROM raw.api_payload p CROSS APPLY OPENJSON(p.payload_json, '$.Items') j WHERE p.endpoint = 'SalesOrders';")
+            print("  -- gzip-compressed rows (payload_codec = 'gzip'; bytes are UTF-8 JSON):")
+            print("  SELECT payload_id, CAST(DECOMPRESS(payload_compressed) AS VARCHAR(MAX)) COLLATE Latin1_General_100_CI_AS_SC_UTF8 FROM raw.api_payload WHERE payload_codec = 'gzip';")
+            print("  -- zstd rows cannot be decoded in SQL; use db.read_raw_payload(payload_id) from Python.")
             print("\n--- Done. ---")
 
     except Exception as e: